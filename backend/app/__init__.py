@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# Settings such as DB_PATH are read at import time, so load .env before any app module
+load_dotenv()
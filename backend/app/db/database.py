@@ -1,23 +1,73 @@
 import os
+from collections.abc import AsyncIterator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
 DB_PATH = os.getenv("DB_PATH", "./data/stock.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
 
-engine = create_engine(f"sqlite:///{DB_PATH}", echo=False)
+# Sync engine: startup migrations, background workers and scripts
+engine = create_engine(f"sqlite:///{DB_PATH}", echo=False, pool_size=DB_POOL_SIZE, max_overflow=DB_POOL_SIZE)
 SessionLocal = sessionmaker(bind=engine)
 
+# Async engine for request handlers, so queries don't block the event loop
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{DB_PATH}", echo=False, pool_size=DB_POOL_SIZE, max_overflow=DB_POOL_SIZE
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+def _set_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers proceed while a write is in progress; NORMAL sync is safe under WAL."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA cache_size=-16000")  # KiB, per connection
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+event.listen(engine, "connect", _set_pragmas)
+event.listen(async_engine.sync_engine, "connect", _set_pragmas)
+
 
 class Base(DeclarativeBase):
     pass
 
 
 def create_tables():
-    from app.db.models import Trade, Watchlist  # noqa: F401
+    from app.db.models import Conversation, ConversationMessage, JournalJob, Trade, TradeTag, Watchlist  # noqa: F401
 
     os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
     Base.metadata.create_all(bind=engine)
+    _migrate()
+
+
+def _migrate():
+    """Bring tables created by older versions up to date (create_all skips existing tables)."""
+    from app.db.models import Trade
+
+    for index in Trade.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+    with engine.begin() as conn:
+        # Leading columns of the (status|ticker, created_at, id) indexes cover these
+        conn.execute(text("DROP INDEX IF EXISTS ix_trades_status"))
+        conn.execute(text("DROP INDEX IF EXISTS ix_trades_ticker"))
+
+    # Move JSON tag lists into trade_tags, then empty them so this runs once
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT OR IGNORE INTO trade_tags (trade_id, tag, position)
+            SELECT trades.id, tag.value, tag.key
+            FROM trades, json_each(trades.tags) AS tag
+            WHERE trades.tags NOT IN ('', '[]')
+        """))
+        conn.execute(text("UPDATE trades SET tags = '[]' WHERE tags NOT IN ('', '[]')"))
 
 
 def get_db():
@@ -26,3 +76,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,17 +1,23 @@
-import json
 from datetime import date, datetime
 
-from sqlalchemy import Date, DateTime, Float, Integer, String, Text
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Date, DateTime, Float, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.database import Base
 
 
 class Trade(Base):
     __tablename__ = "trades"
+    __table_args__ = (
+        # Keyset pagination (created_at, id) with the listing filters
+        Index("ix_trades_created_id", "created_at", "id"),
+        Index("ix_trades_status_created_id", "status", "created_at", "id"),
+        Index("ix_trades_ticker_created_id", "ticker", "created_at", "id"),
+        Index("ix_trades_entry_date", "entry_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    ticker: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
+    ticker: Mapped[str] = mapped_column(String(20), nullable=False)
     direction: Mapped[str] = mapped_column(String(10), nullable=False)  # long / short
     entry_date: Mapped[date] = mapped_column(Date, nullable=False)
     entry_price: Mapped[float] = mapped_column(Float, nullable=False)
@@ -23,18 +29,32 @@ class Trade(Base):
     exit_reason: Mapped[str | None] = mapped_column(Text, nullable=True)
     pnl: Mapped[float | None] = mapped_column(Float, nullable=True)
     pnl_pct: Mapped[float | None] = mapped_column(Float, nullable=True)
-    status: Mapped[str] = mapped_column(String(20), default="open", index=True)  # open / closed / cancelled
-    _tags: Mapped[str] = mapped_column("tags", Text, default="[]")
+    status: Mapped[str] = mapped_column(String(20), default="open")  # open / closed / cancelled
+    # Pre-trade_tags JSON list; emptied once migrated, kept so older databases stay writable
+    _legacy_tags: Mapped[str] = mapped_column("tags", Text, default="[]")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
 
+    tag_rows: Mapped[list["TradeTag"]] = relationship(
+        cascade="all, delete-orphan", lazy="selectin", order_by="TradeTag.position"
+    )
+
     @property
     def tags(self) -> list[str]:
-        return json.loads(self._tags) if self._tags else []
+        return [row.tag for row in self.tag_rows]
 
     @tags.setter
     def tags(self, value: list[str]):
-        self._tags = json.dumps(value, ensure_ascii=False)
+        self.tag_rows = [TradeTag(tag=tag, position=i) for i, tag in enumerate(dict.fromkeys(value))]
+
+
+class TradeTag(Base):
+    __tablename__ = "trade_tags"
+    __table_args__ = (Index("ix_trade_tags_tag_trade", "tag", "trade_id"),)
+
+    trade_id: Mapped[int] = mapped_column(Integer, ForeignKey("trades.id", ondelete="CASCADE"), primary_key=True)
+    tag: Mapped[str] = mapped_column(String(50), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, default=0)  # order the tags were given in
 
 
 class Watchlist(Base):
@@ -47,3 +67,37 @@ class Watchlist(Base):
     added_date: Mapped[date] = mapped_column(Date, default=date.today)
     memo: Mapped[str] = mapped_column(Text, default="")
     status: Mapped[str] = mapped_column(String(20), default="active")  # active / archived
+
+
+class JournalJob(Base):
+    """Pending Obsidian write for a trade note, committed with the trade change itself."""
+
+    __tablename__ = "journal_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    trade_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    action: Mapped[str] = mapped_column(String(10), nullable=False)  # open / close
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, index=True)
+
+
+class ConversationMessage(Base):
+    __tablename__ = "conversation_messages"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    conversation_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    role: Mapped[str] = mapped_column(String(10), nullable=False)  # user / assistant
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    context: Mapped[str | None] = mapped_column(Text, nullable=True)  # indicator block sent with a user turn
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
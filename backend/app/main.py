@@ -1,18 +1,22 @@
 from contextlib import asynccontextmanager
 
-from dotenv import load_dotenv
 from fastapi import FastAPI
 
-load_dotenv()
-
-from app.db.database import create_tables
-from app.routers import analysis, market, trade, watchlist
+from app.db.database import async_engine, create_tables
+from app.routers import analysis, backtest, market, trade, watchlist
+from app.services import batch, journal_queue, scheduler
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_tables()
+    scheduler.start()
+    journal_queue.start()
     yield
+    await journal_queue.stop()
+    await scheduler.stop()
+    batch.shutdown()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -26,6 +30,7 @@ app.include_router(market.router, prefix="/api/market", tags=["market"])
 app.include_router(analysis.router, prefix="/api/analysis", tags=["analysis"])
 app.include_router(trade.router, prefix="/api/trade", tags=["trade"])
 app.include_router(watchlist.router, prefix="/api/watchlist", tags=["watchlist"])
+app.include_router(backtest.router, prefix="/api/backtest", tags=["backtest"])
 
 
 @app.get("/api/health")
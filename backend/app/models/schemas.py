@@ -29,6 +29,17 @@ class TechnicalIndicators(BaseModel):
     volume_ratio: float | None = None  # vs 20-day average
 
 
+class PriceSeries(BaseModel):
+    """Columnar OHLCV + indicator series: one array per column, aligned with `index`."""
+
+    ticker: str
+    interval: str
+    index: list[str]
+    columns: dict[str, list[float | None]]
+    source_points: int  # bars in range before downsampling
+    downsampled: bool
+
+
 # --- Trade ---
 class TradeCreate(BaseModel):
     ticker: str
@@ -64,6 +75,78 @@ class TradeResponse(BaseModel):
     created_at: datetime
 
 
+class TradeStatsGroup(BaseModel):
+    key: str
+    trades: int
+    wins: int
+    win_rate: float | None
+    total_pnl: float
+    avg_pnl: float | None
+    avg_pnl_pct: float | None
+
+
+class TagStats(TradeStatsGroup):
+    open_trades: int
+
+
+class TradeStats(BaseModel):
+    open_trades: int
+    closed_trades: int
+    wins: int
+    win_rate: float | None
+    total_pnl: float
+    avg_pnl: float | None
+    avg_pnl_pct: float | None
+    best_pnl: float | None
+    worst_pnl: float | None
+    by_month: list[TradeStatsGroup]
+    by_ticker: list[TradeStatsGroup]
+    by_tag: list[TradeStatsGroup]
+    by_direction: list[TradeStatsGroup]
+
+
+class PortfolioPosition(BaseModel):
+    id: int
+    ticker: str
+    direction: str
+    entry_date: date
+    entry_price: float
+    last_price: float | None
+    last_date: date | None
+    unrealized_pnl: float | None
+    unrealized_pct: float | None
+    stop_loss: float | None
+    target_price: float | None
+    stop_distance_pct: float | None  # % of price left before the stop (negative once breached)
+    target_distance_pct: float | None  # % of price still to go to the target
+    exposure: float | None  # signed per-share market value: negative for shorts
+    weight_pct: float | None  # share of gross exposure
+    holding_days: int
+
+
+class EquityPoint(BaseModel):
+    date: date
+    realized: float
+    unrealized: float
+    equity: float
+
+
+class Portfolio(BaseModel):
+    positions: list[PortfolioPosition]
+    open_positions: int
+    unrealized_pnl: float
+    realized_pnl: float
+    total_pnl: float
+    long_exposure: float
+    short_exposure: float
+    gross_exposure: float
+    net_exposure: float
+    max_drawdown: float
+    curve: list[EquityPoint]  # daily, per share like Trade.pnl
+    missing: list[str]  # tickers with no bars; their positions are not marked
+    timings: dict[str, float]
+
+
 # --- Watchlist ---
 class WatchlistAdd(BaseModel):
     ticker: str
@@ -80,6 +163,19 @@ class WatchlistItem(BaseModel):
     status: str
 
 
+class ScreenRow(TechnicalIndicators):
+    rank: int
+    name: str | None = None
+
+
+class ScreenResponse(BaseModel):
+    rows: list[ScreenRow]
+    screened: int
+    matched: int
+    missing: list[str]  # tickers with no bars or too few to compute indicators
+    timings: dict[str, float]  # seconds per stage: load / indicators / filter / total
+
+
 # --- Analysis ---
 class AnalysisRequest(BaseModel):
     message: str
@@ -91,3 +187,81 @@ class AnalysisResponse(BaseModel):
     response: str
     conversation_id: str
     indicators: TechnicalIndicators | None = None
+    cached: bool = False  # served from the first-turn answer cache
+    latency_ms: float | None = None
+
+
+class ReportRequest(BaseModel):
+    tickers: list[str] | None = None  # default: active watchlist
+    prompt: str | None = None
+    obsidian: bool = False  # also write per-ticker notes and the report to the vault
+
+
+class ReportItem(BaseModel):
+    ticker: str
+    status: str  # pending / running / done / error
+    response: str | None = None
+    error: str | None = None
+    latency_ms: float | None = None
+    note_path: str | None = None
+
+
+class ReportJob(BaseModel):
+    job_id: str
+    status: str  # pending / running / done / error
+    report_date: date
+    total: int
+    completed: int
+    failed: int
+    items: list[ReportItem]
+    timings: dict[str, float]
+    started_at: datetime
+    finished_at: datetime | None = None
+    report: str | None = None
+    report_path: str | None = None
+    error: str | None = None
+
+
+# --- Backtest ---
+class BacktestRule(BaseModel):
+    entry: str  # clauses joined by "and", e.g. "rsi_14 < 30 and close < bb_lower"
+    name: str | None = None
+    direction: str = Field(default="long", pattern="^(long|short)$")
+    target_pct: float | None = Field(default=5.0, gt=0)
+    stop_pct: float | None = Field(default=3.0, gt=0)
+    max_hold: int = Field(default=20, ge=1, le=250)  # bars before a time exit at the close
+
+
+class BacktestRequest(BaseModel):
+    rules: list[BacktestRule] = Field(min_length=1)
+    tickers: list[str] | None = None  # defaults to the active watchlist
+    period: str = "2y"
+
+
+class BacktestRuleStats(BaseModel):
+    name: str
+    entry: str
+    direction: str
+    trades: int
+    wins: int
+    win_rate: float | None
+    total_pnl: float
+    avg_pnl: float | None
+    avg_pnl_pct: float | None
+    best_pnl: float | None
+    worst_pnl: float | None
+    avg_bars: float | None
+    exits: dict[str, int]  # closed trades by exit: target / stop / time
+    open_trades: int  # still held at the last stored bar, not counted above
+    by_ticker: list[TradeStatsGroup]
+
+
+class BacktestResult(BaseModel):
+    rules: list[BacktestRuleStats]
+    tickers: int
+    missing: list[str]  # tickers without enough stored bars
+    first_date: date | None  # bars actually covered, which may start after the period does
+    last_date: date | None
+    bars: int
+    bars_per_second: float | None
+    timings: dict[str, float]  # seconds: simulate / aggregate / total
@@ -0,0 +1,15 @@
+"""Sync every trade to its Obsidian note: ``python -m app.reconcile``."""
+
+import json
+
+from app.db.database import create_tables
+from app.services import journal_queue
+
+
+def main():
+    create_tables()
+    print(json.dumps(journal_queue.reconcile(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,45 @@
-from fastapi import APIRouter, HTTPException
+import json
+import time
+from collections.abc import AsyncIterator
 
-from app.models.schemas import AnalysisRequest, AnalysisResponse, TechnicalIndicators
-from app.services import llm, stock_data, technical
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_async_db
+from app.models.schemas import AnalysisRequest, AnalysisResponse, ReportJob, ReportRequest, TechnicalIndicators
+from app.services import llm, reports, stock_data, trade_stats
 
 router = APIRouter()
 
 
+async def _ticker_context(ticker: str | None, db: AsyncSession) -> tuple[TechnicalIndicators | None, str]:
+    """Indicators and the LLM context block (indicators plus our record in the ticker)."""
+    if not ticker:
+        return None, ""
+    ind_dict = await stock_data.aget_indicators(ticker, period="6mo")
+    stats = await db.run_sync(trade_stats.ticker_summary, ticker)
+    indicators = TechnicalIndicators(ticker=ticker, **ind_dict) if ind_dict else None
+    return indicators, llm.build_context(ticker=ticker, indicators=ind_dict, trade_stats=stats)
+
+
 @router.post("/chat", response_model=AnalysisResponse)
-async def chat(request: AnalysisRequest):
+async def chat(request: AnalysisRequest, db: AsyncSession = Depends(get_async_db)):
     """Chat with LLM about stock analysis."""
-    indicators = None
-    context = ""
-
-    if request.ticker:
-        df = stock_data.get_history(request.ticker, period="6mo")
-        ind_dict = technical.calculate_indicators(df)
-        if ind_dict:
-            indicators = TechnicalIndicators(ticker=request.ticker, **ind_dict)
-            context = llm.build_context(ticker=request.ticker, indicators=ind_dict)
+    start = time.perf_counter()
+    indicators, context = await _ticker_context(request.ticker, db)
 
     try:
-        response_text, conv_id = llm.chat(
+        response_text, conv_id, cached = await llm.chat(
             message=request.message,
             conversation_id=request.conversation_id,
             context=context,
+            ticker=request.ticker,
         )
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail=f"LLM API timed out after {llm.LLM_TIMEOUT:.0f}s")
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"LLM API error: {e}")
 
@@ -34,4 +47,83 @@ async def chat(request: AnalysisRequest):
         response=response_text,
         conversation_id=conv_id,
         indicators=indicators,
+        cached=cached,
+        latency_ms=round((time.perf_counter() - start) * 1000, 1),
     )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: AnalysisRequest, db: AsyncSession = Depends(get_async_db)):
+    """Chat with LLM, relaying the answer as Server-Sent Events.
+
+    Events: `meta` (conversation_id, indicators, cached), then `token`
+    ({"text"}) per chunk, then `done` (with cached, latency_ms); `error`
+    ({"detail"}) if the provider fails mid-stream.
+    """
+    start = time.perf_counter()
+    indicators, context = await _ticker_context(request.ticker, db)
+
+    try:
+        chunks, conv_id, cached = await llm.chat_stream(
+            message=request.message,
+            conversation_id=request.conversation_id,
+            context=context,
+            ticker=request.ticker,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("meta", {
+            "conversation_id": conv_id,
+            "indicators": indicators.model_dump(mode="json") if indicators else None,
+            "cached": cached,
+        })
+        try:
+            async for text in chunks:
+                yield _sse("token", {"text": text})
+        except TimeoutError:
+            yield _sse("error", {"detail": f"LLM API timed out after {llm.LLM_TIMEOUT:.0f}s"})
+            return
+        except Exception as e:
+            yield _sse("error", {"detail": f"LLM API error: {e}"})
+            return
+        yield _sse("done", {
+            "conversation_id": conv_id,
+            "cached": cached,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/usage")
+async def usage():
+    """LLM token usage per provider, split into uncached, cache-read and cache-write input tokens."""
+    return llm.usage_stats()
+
+
+@router.post("/reports", response_model=ReportJob, status_code=202)
+async def start_report(request: ReportRequest):
+    """Start an AI report over the watchlist (or given tickers); poll GET /reports/{job_id}."""
+    try:
+        return reports.start_job(request.tickers, request.prompt, request.obsidian)
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/reports/{job_id}", response_model=ReportJob)
+async def get_report(job_id: str):
+    """Progress, per-ticker latency and, once done, the consolidated report."""
+    job = reports.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job
@@ -0,0 +1,40 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_async_db
+from app.db.models import Watchlist
+from app.models.schemas import BacktestRequest, BacktestResult
+from app.services import backtest
+
+router = APIRouter()
+
+
+@router.post("/", response_model=BacktestResult)
+async def run_backtest(req: BacktestRequest, db: AsyncSession = Depends(get_async_db)):
+    """Backtest entry rules on stored daily bars (no downloads) with target/stop/time exits."""
+    try:
+        rules = [
+            backtest.parse_rule(
+                r.entry,
+                name=r.name,
+                direction=r.direction,
+                target_pct=r.target_pct,
+                stop_pct=r.stop_pct,
+                max_hold=r.max_hold,
+            )
+            for r in req.rules
+        ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    tickers = req.tickers
+    if not tickers:
+        tickers = list(await db.scalars(select(Watchlist.ticker).where(Watchlist.status == "active")))
+
+    try:
+        return await asyncio.to_thread(backtest.run, tickers, rules, req.period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
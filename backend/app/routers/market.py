@@ -1,7 +1,10 @@
-from fastapi import APIRouter
+from datetime import date
 
-from app.models.schemas import StockQuote, TechnicalIndicators
-from app.services import stock_data, technical
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+
+from app.models.schemas import PriceSeries, StockQuote, TechnicalIndicators
+from app.services import scheduler, series, stock_data
 
 router = APIRouter()
 
@@ -9,13 +12,80 @@ router = APIRouter()
 @router.get("/quote/{ticker}", response_model=StockQuote)
 async def get_quote(ticker: str):
     """Get current quote for a ticker."""
-    quote = stock_data.get_quote(ticker)
+    quote = await stock_data.aget_quote(ticker)
     return StockQuote(**quote)
 
 
 @router.get("/indicators/{ticker}", response_model=TechnicalIndicators)
 async def get_indicators(ticker: str, period: str = "6mo"):
     """Get technical indicators for a ticker."""
-    df = stock_data.get_history(ticker, period=period)
-    indicators = technical.calculate_indicators(df)
+    indicators = await stock_data.aget_indicators(ticker, period=period)
     return TechnicalIndicators(ticker=ticker, **indicators)
+
+
+@router.get("/series/{ticker}", response_model=PriceSeries)
+async def get_series(
+    ticker: str,
+    period: str = "1y",
+    interval: str = "1d",
+    start: date | None = None,
+    end: date | None = None,
+    max_points: int | None = Query(default=500, ge=10),
+    format: str = Query(default="json", pattern="^(json|arrow)$"),
+):
+    """OHLCV plus indicator series for charting, as arrays per column.
+
+    Bars are fetched for `period`, or further back when `start` needs it.
+    Long ranges are downsampled server-side to `max_points` buckets.
+    `format=arrow` returns an Arrow IPC stream instead of JSON.
+    """
+    try:
+        period = series.fetch_period(period, interval, start)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    df = await stock_data.aget_history(ticker, period=period, interval=interval)
+    if df.empty:
+        raise HTTPException(status_code=404, detail="No price data")
+
+    frame, source_points = series.build_series(df, start=start, end=end, max_points=max_points)
+
+    if format == "arrow":
+        try:
+            return Response(content=series.to_arrow_ipc(frame), media_type=series.ARROW_MEDIA_TYPE)
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+
+    index_format = "%Y-%m-%d" if interval[-1] in "dko" else "%Y-%m-%dT%H:%M:%S%z"
+    # Returned directly: building the model would re-validate every element of every column
+    return JSONResponse({
+        "ticker": ticker,
+        "interval": interval,
+        "index": frame.index.strftime(index_format).tolist(),
+        "columns": series.to_columns(frame),
+        "source_points": source_points,
+        "downsampled": len(frame) < source_points,
+    })
+
+
+@router.get("/limiter")
+async def get_limiter_stats():
+    """Upstream (yfinance) rate limiter queue depth, wait times and budgets."""
+    return stock_data.limiter_stats()
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """In-memory market data cache usage and hit/miss/eviction statistics."""
+    return stock_data.cache_stats()
+
+
+@router.get("/prewarm")
+async def get_prewarm_status():
+    """Background cache pre-warming: last run time, duration and failures."""
+    return scheduler.status()
+
+
+@router.post("/prewarm")
+async def trigger_prewarm():
+    """Start a pre-warm run now (no-op if one is already running)."""
+    return {"started": scheduler.trigger(), **scheduler.status()}
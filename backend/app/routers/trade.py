@@ -1,15 +1,23 @@
-from datetime import date
+import asyncio
+import base64
+from datetime import date, datetime
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import get_db
-from app.db.models import Trade
-from app.models.schemas import TradeClose, TradeCreate, TradeResponse
-from app.services import obsidian, stock_data, technical
+from app.db.database import get_async_db
+from app.db.models import Trade, TradeTag
+from app.models.schemas import Portfolio, TagStats, TradeClose, TradeCreate, TradeResponse, TradeStats
+from app.services import journal_queue, portfolio, trade_stats
 
 router = APIRouter()
 
+# TradeResponse field -> column, for ?fields= projections
+_FIELD_COLUMNS = {name: getattr(Trade, name) for name in TradeResponse.model_fields if name != "tags"}
+
 
 def _trade_to_response(trade: Trade) -> TradeResponse:
     return TradeResponse(
@@ -33,7 +41,7 @@ def _trade_to_response(trade: Trade) -> TradeResponse:
 
 
 @router.post("/", response_model=TradeResponse)
-async def create_trade(req: TradeCreate, db: Session = Depends(get_db)):
+async def create_trade(req: TradeCreate, db: AsyncSession = Depends(get_async_db)):
     """Record a new trade entry."""
     trade = Trade(
         ticker=req.ticker,
@@ -46,31 +54,20 @@ async def create_trade(req: TradeCreate, db: Session = Depends(get_db)):
     )
     trade.tags = req.tags
     db.add(trade)
-    db.commit()
-    db.refresh(trade)
+    await db.flush()
 
-    # Write Obsidian journal
-    df = stock_data.get_history(req.ticker, period="6mo")
-    indicators = technical.calculate_indicators(df) if not df.empty else None
-    obsidian.write_trade_journal(
-        ticker=req.ticker,
-        direction=req.direction,
-        entry_date=trade.entry_date,
-        entry_price=req.entry_price,
-        entry_reason=req.entry_reason,
-        target_price=req.target_price,
-        stop_loss=req.stop_loss,
-        indicators=indicators,
-        tags=req.tags,
-    )
+    # Obsidian journal is written in the background
+    journal_queue.enqueue(db, trade, "open")
+    await db.commit()
+    journal_queue.notify()
 
     return _trade_to_response(trade)
 
 
 @router.post("/{trade_id}/close", response_model=TradeResponse)
-async def close_trade(trade_id: int, req: TradeClose, db: Session = Depends(get_db)):
+async def close_trade(trade_id: int, req: TradeClose, db: AsyncSession = Depends(get_async_db)):
     """Close an existing trade."""
-    trade = db.query(Trade).filter(Trade.id == trade_id).first()
+    trade = await db.get(Trade, trade_id)
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
     if trade.status != "open":
@@ -88,36 +85,136 @@ async def close_trade(trade_id: int, req: TradeClose, db: Session = Depends(get_
         trade.pnl = trade.entry_price - req.exit_price
     trade.pnl_pct = (trade.pnl / trade.entry_price) * 100
 
-    db.commit()
-    db.refresh(trade)
-
-    # Update Obsidian journal
-    obsidian.update_trade_close(
-        ticker=trade.ticker,
-        entry_date=trade.entry_date,
-        exit_date=trade.exit_date,
-        exit_price=req.exit_price,
-        exit_reason=req.exit_reason,
-        pnl=trade.pnl,
-        pnl_pct=trade.pnl_pct,
-    )
+    journal_queue.enqueue(db, trade, "close")
+    await db.commit()
+    journal_queue.notify()
 
     return _trade_to_response(trade)
 
 
+def _encode_cursor(created_at: datetime, trade_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{trade_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, trade_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(trade_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse_fields(fields: str) -> list[str]:
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in TradeResponse.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+
 @router.get("/", response_model=list[TradeResponse])
-async def list_trades(status: str | None = None, db: Session = Depends(get_db)):
-    """List trades, optionally filtered by status."""
-    query = db.query(Trade).order_by(Trade.created_at.desc())
+async def list_trades(
+    response: Response,
+    status: str | None = None,
+    ticker: str | None = None,
+    tag: str | None = None,
+    date_from: date | None = Query(None, description="Earliest entry date"),
+    date_to: date | None = Query(None, description="Latest entry date"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    fields: str | None = Query(None, description="Comma-separated subset of fields, e.g. id,ticker,pnl"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """List trades newest first, one page at a time.
+
+    The next page's cursor is returned in the X-Next-Cursor header (absent on
+    the last page). With ``fields`` only those columns are selected and
+    returned, skipping ORM objects entirely.
+    """
+    selected = _parse_fields(fields) if fields else None
+    columns = [_FIELD_COLUMNS[f] for f in selected if f != "tags"] if selected else [Trade]
+    stmt = select(*columns, Trade.created_at.label("_created_at"), Trade.id.label("_id"))
+    if tag:
+        stmt = stmt.where(select(TradeTag.trade_id).where(TradeTag.trade_id == Trade.id, TradeTag.tag == tag).exists())
     if status:
-        query = query.filter(Trade.status == status)
-    return [_trade_to_response(t) for t in query.all()]
+        stmt = stmt.where(Trade.status == status)
+    if ticker:
+        stmt = stmt.where(Trade.ticker == ticker)
+    if date_from:
+        stmt = stmt.where(Trade.entry_date >= date_from)
+    if date_to:
+        stmt = stmt.where(Trade.entry_date <= date_to)
+    if cursor:
+        stmt = stmt.where(tuple_(Trade.created_at, Trade.id) < _decode_cursor(cursor))
+    stmt = stmt.order_by(Trade.created_at.desc(), Trade.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).all()
+    next_cursor = _encode_cursor(rows[limit - 1]._created_at, rows[limit - 1]._id) if len(rows) > limit else None
+    rows = rows[:limit]
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    if selected is None:
+        response.headers.update(headers)
+        return [_trade_to_response(row[0]) for row in rows]
+
+    items = [dict(row._mapping) for row in rows]
+    if "tags" in selected:
+        tags: dict[int, list[str]] = {item["_id"]: [] for item in items}
+        tag_rows = await db.execute(
+            select(TradeTag.trade_id, TradeTag.tag)
+            .where(TradeTag.trade_id.in_(tags))
+            .order_by(TradeTag.trade_id, TradeTag.position)
+        )
+        for trade_id, name in tag_rows:
+            tags[trade_id].append(name)
+        for item in items:
+            item["tags"] = tags[item["_id"]]
+    items = [{f: item[f] for f in selected} for item in items]
+    return JSONResponse(jsonable_encoder(items), headers=headers)
+
+
+@router.get("/stats", response_model=TradeStats)
+async def get_trade_stats(ticker: str | None = None, db: AsyncSession = Depends(get_async_db)):
+    """Win rate and P/L of closed trades, overall and per month, ticker, tag and direction."""
+    return await db.run_sync(trade_stats.compute, ticker)
+
+
+@router.get("/tags", response_model=list[TagStats])
+async def get_tag_stats(db: AsyncSession = Depends(get_async_db)):
+    """Every tag with open/closed counts and closed-trade win rate and P/L."""
+    return await db.run_sync(trade_stats.tag_summary)
+
+
+@router.get("/portfolio", response_model=Portfolio)
+async def get_portfolio(
+    period: str = Query("1y", description="Equity curve window, e.g. 6mo, 1y, 5y"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Open trades marked to their latest close, exposure, and the daily realized + unrealized P/L curve."""
+    columns = [getattr(Trade, name) for name in portfolio.TRADE_FIELDS]
+    rows = [row._asdict() for row in await db.execute(select(*columns))]
+    try:
+        return await asyncio.to_thread(portfolio.compute, rows, period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/journal-queue")
+async def journal_queue_status():
+    """Pending and failed Obsidian journal writes."""
+    return await asyncio.to_thread(journal_queue.status)
+
+
+@router.post("/journal-reconcile")
+async def journal_reconcile():
+    """Sync every trade to its Obsidian note, writing only notes that change."""
+    return await asyncio.to_thread(journal_queue.reconcile)
 
 
 @router.get("/{trade_id}", response_model=TradeResponse)
-async def get_trade(trade_id: int, db: Session = Depends(get_db)):
+async def get_trade(trade_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a single trade by ID."""
-    trade = db.query(Trade).filter(Trade.id == trade_id).first()
+    trade = await db.get(Trade, trade_id)
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
     return _trade_to_response(trade)
@@ -1,22 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
 
-from app.db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_async_db
 from app.db.models import Watchlist
-from app.models.schemas import WatchlistAdd, WatchlistItem
-from app.services import stock_data
+from app.models.schemas import ScreenResponse, WatchlistAdd, WatchlistItem
+from app.services import screener, stock_data
 
 router = APIRouter()
 
 
 @router.post("/", response_model=WatchlistItem)
-async def add_to_watchlist(req: WatchlistAdd, db: Session = Depends(get_db)):
+async def add_to_watchlist(req: WatchlistAdd, db: AsyncSession = Depends(get_async_db)):
     """Add a ticker to the watchlist."""
-    existing = db.query(Watchlist).filter(Watchlist.ticker == req.ticker).first()
+    existing = await db.scalar(select(Watchlist).where(Watchlist.ticker == req.ticker))
     if existing:
         raise HTTPException(status_code=409, detail="Already in watchlist")
 
-    info = stock_data.get_ticker_info(req.ticker)
+    info = await stock_data.aget_ticker_info(req.ticker)
     item = Watchlist(
         ticker=req.ticker,
         name=info.get("shortName") or info.get("longName"),
@@ -24,8 +27,7 @@ async def add_to_watchlist(req: WatchlistAdd, db: Session = Depends(get_db)):
         memo=req.memo,
     )
     db.add(item)
-    db.commit()
-    db.refresh(item)
+    await db.commit()
 
     return WatchlistItem(
         id=item.id,
@@ -39,9 +41,9 @@ async def add_to_watchlist(req: WatchlistAdd, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=list[WatchlistItem])
-async def list_watchlist(db: Session = Depends(get_db)):
+async def list_watchlist(db: AsyncSession = Depends(get_async_db)):
     """List all watchlist items."""
-    items = db.query(Watchlist).filter(Watchlist.status == "active").all()
+    items = await db.scalars(select(Watchlist).where(Watchlist.status == "active"))
     return [
         WatchlistItem(
             id=item.id,
@@ -56,12 +58,43 @@ async def list_watchlist(db: Session = Depends(get_db)):
     ]
 
 
+@router.get("/screen", response_model=ScreenResponse)
+async def screen_watchlist(
+    filters: list[str] = Query(default=[], alias="filter", description='Indicator filters, e.g. "rsi_14<30"'),
+    sort: str = Query(default=screener.DEFAULT_SORT, description="Indicator to rank by"),
+    order: str = Query(default="desc", pattern="^(asc|desc)$"),
+    limit: int | None = Query(default=None, ge=1),
+    period: str = "6mo",
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Screen active watchlist tickers by indicator filters, ranked by `sort`."""
+    items = await db.scalars(select(Watchlist).where(Watchlist.status == "active"))
+    names = {item.ticker: item.name for item in items}
+
+    try:
+        result = await asyncio.to_thread(
+            screener.screen,
+            list(names),
+            filters,
+            sort_by=sort,
+            descending=order == "desc",
+            limit=limit,
+            period=period,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    for row in result["rows"]:
+        row["name"] = names.get(row["ticker"])
+    return ScreenResponse(**result)
+
+
 @router.delete("/{item_id}")
-async def remove_from_watchlist(item_id: int, db: Session = Depends(get_db)):
+async def remove_from_watchlist(item_id: int, db: AsyncSession = Depends(get_async_db)):
     """Archive a watchlist item."""
-    item = db.query(Watchlist).filter(Watchlist.id == item_id).first()
+    item = await db.get(Watchlist, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     item.status = "archived"
-    db.commit()
+    await db.commit()
     return {"status": "archived"}
@@ -0,0 +1,224 @@
+"""Rule backtests over the local bar store.
+
+A rule is an entry condition over OHLCV and indicator columns, e.g.
+``"rsi_14 < 30 and close < bb_lower"``, plus exit settings. Signals are
+evaluated over whole series at once; each signal enters at that bar's close
+and exits at the target, the stop or after ``max_hold`` bars, one position
+per ticker and rule at a time. P/L is per share and computed like
+``Trade.pnl``, so results compare with ``/api/trade/stats``.
+
+Only stored bars are used (no downloads); tickers are spread over a process
+pool, and each worker reads its own bars.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from app.services import bar_store, batch, stock_data, technical, trade_stats
+
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+POOL_MIN_TICKERS = 8  # workers load and simulate whole series, so the pool pays off sooner than the screener's
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+RULE_COLUMNS = PRICE_COLUMNS + technical.SERIES_COLUMNS
+
+_EXIT_REASONS = ("target", "stop", "time")
+
+_pool = batch.WorkerPool(BACKTEST_WORKERS, POOL_MIN_TICKERS)
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    entry: str
+    clauses: tuple[tuple[str, str, str | float], ...]
+    direction: str = "long"
+    target_pct: float | None = None
+    stop_pct: float | None = None
+    max_hold: int = 20
+
+
+def parse_rule(
+    entry: str,
+    name: str | None = None,
+    direction: str = "long",
+    target_pct: float | None = None,
+    stop_pct: float | None = None,
+    max_hold: int = 20,
+) -> Rule:
+    """Parse clauses joined by ``and``, each comparing a column to a number or another column.
+
+    Raises ValueError on bad input.
+    """
+    clauses = [
+        batch.parse_condition(part.lower(), RULE_COLUMNS, column_rhs=True)
+        for part in re.split(r"\s+and\s+", entry.strip(), flags=re.IGNORECASE)
+    ]
+    if direction not in ("long", "short"):
+        raise ValueError(f"Invalid direction: {direction}")
+    return Rule(name or entry, entry, tuple(clauses), direction, target_pct, stop_pct, max_hold)
+
+
+def signals(frame: pd.DataFrame, rule: Rule) -> np.ndarray:
+    """Boolean entry mask over ``frame``; NaN compares False, so warm-up bars never signal."""
+    return batch.mask(frame, rule.clauses)
+
+
+def simulate(frame: pd.DataFrame, rule: Rule) -> dict[str, np.ndarray | int]:
+    """Closed trades for one ticker: entry/exit bar, P/L, P/L % and exit reason index.
+
+    Target and stop are checked from the bar after entry on its high/low; a
+    bar that opens through a level fills at the open, and a bar that touches
+    both counts as stopped out. A position still held at the last bar is
+    reported in ``open`` rather than closed at an arbitrary price.
+    """
+    open_, high, low, close = (frame[col].to_numpy(dtype=float) for col in ("open", "high", "low", "close"))
+    n = len(close)
+    entries = np.flatnonzero(signals(frame, rule)[:-1]) if n else np.array([], dtype=int)
+    hold = rule.max_hold
+    long = rule.direction == "long"
+    sign = 1.0 if long else -1.0
+
+    price = close[entries]
+    bars = entries[:, None] + np.arange(1, hold + 1)
+    valid = bars < n
+    bars = np.minimum(bars, n - 1)
+
+    def first_hit(level_pct: float | None, adverse: bool) -> tuple[np.ndarray, np.ndarray]:
+        if level_pct is None:
+            return np.full(len(entries), hold), np.full(len(entries), np.nan)
+        up = long != adverse  # long target / short stop sit above the entry
+        level = price * (1 + level_pct / 100 if up else 1 - level_pct / 100)
+        hit = (high[bars] >= level[:, None] if up else low[bars] <= level[:, None]) & valid
+        first = np.where(hit.any(axis=1), hit.argmax(axis=1), hold)
+        fill_open = open_[bars[np.arange(len(entries)), np.minimum(first, hold - 1)]]
+        fill = np.maximum(fill_open, level) if up else np.minimum(fill_open, level)
+        return first, fill
+
+    stop_at, stop_fill = first_hit(rule.stop_pct, adverse=True)
+    target_at, target_fill = first_hit(rule.target_pct, adverse=False)
+
+    stopped = (stop_at < hold) & (stop_at <= target_at)
+    targeted = (target_at < hold) & ~stopped
+    exit_bar = np.where(stopped, entries + 1 + stop_at, np.where(targeted, entries + 1 + target_at, entries + hold))
+    unfinished = ~stopped & ~targeted & (exit_bar >= n)
+    exit_bar = np.where(unfinished, n, exit_bar)
+    exit_price = np.where(stopped, stop_fill, np.where(targeted, target_fill, close[np.minimum(exit_bar, n - 1)]))
+    reason = np.where(stopped, 1, np.where(targeted, 0, 2))
+
+    # One position at a time: skip signals until the previous trade has exited
+    taken = []
+    free_from = 0
+    for j, entry in enumerate(entries):
+        if entry >= free_from:
+            taken.append(j)
+            free_from = exit_bar[j]
+    taken = np.array(taken, dtype=int)
+    still_open = int(unfinished[taken].sum())
+    taken = taken[~unfinished[taken]]
+
+    pnl = sign * (exit_price[taken] - price[taken])
+    return {
+        "entry": entries[taken],
+        "exit": exit_bar[taken],
+        "pnl": pnl,
+        "pnl_pct": pnl / price[taken] * 100,
+        "reason": reason[taken],
+        "open": still_open,
+    }
+
+
+def _frame(df: pd.DataFrame) -> pd.DataFrame:
+    frame = df[bar_store.OHLCV_COLUMNS].rename(columns=str.lower)
+    return frame.join(technical.calculate_series(df))
+
+
+def _backtest_chunk(tickers: list[str], rules: list[Rule], start_ts: int) -> list[tuple]:
+    """(ticker, bars, first date, last date, per-rule trades) for each ticker with stored bars."""
+    results = []
+    for ticker in tickers:
+        df = bar_store.load(ticker, "1d", start_ts)
+        if len(df) < technical.MIN_BARS:
+            continue
+        frame = _frame(df)
+        trades = [simulate(frame, rule) for rule in rules]
+        results.append((ticker, len(frame), df.index[0].date(), df.index[-1].date(), trades))
+    return results
+
+
+def _stats(pnl: np.ndarray, pnl_pct: np.ndarray) -> dict:
+    trades = len(pnl)
+    return trade_stats.summarize(
+        trades,
+        int((pnl > 0).sum()),
+        float(pnl.sum()),
+        float(pnl.mean()) if trades else None,
+        float(pnl_pct.mean()) if trades else None,
+    )
+
+
+def _summarize(rule: Rule, per_ticker: list[tuple[str, dict]]) -> dict:
+    merged = {
+        key: np.concatenate([r[key] for _, r in per_ticker]) if per_ticker else np.array([])
+        for key in ("pnl", "pnl_pct", "reason", "entry", "exit")
+    }
+    pnl = merged["pnl"]
+    return {
+        "name": rule.name,
+        "entry": rule.entry,
+        "direction": rule.direction,
+        **_stats(pnl, merged["pnl_pct"]),
+        "best_pnl": round(float(pnl.max()), 2) if len(pnl) else None,
+        "worst_pnl": round(float(pnl.min()), 2) if len(pnl) else None,
+        "avg_bars": round(float((merged["exit"] - merged["entry"]).mean()), 1) if len(pnl) else None,
+        "exits": {name: int((merged["reason"] == i).sum()) for i, name in enumerate(_EXIT_REASONS)},
+        "open_trades": sum(r["open"] for _, r in per_ticker),
+        "by_ticker": [
+            {"key": ticker, **_stats(r["pnl"], r["pnl_pct"])} for ticker, r in per_ticker if len(r["pnl"])
+        ],
+    }
+
+
+def run(tickers: list[str], rules: list[Rule], period: str = "2y") -> dict:
+    """Backtest every rule on every ticker's stored daily bars over ``period``.
+
+    Tickers without enough stored bars are listed in ``missing``. Raises
+    ValueError for a period that does not map to a date range.
+    """
+    start_ts = stock_data.period_start(period)
+    if start_ts is None:
+        raise ValueError(f"Unsupported period: {period}")
+    tickers = list(dict.fromkeys(tickers))
+
+    timings: dict[str, float] = {}
+    start = time.perf_counter()
+    results = _pool.run(_backtest_chunk, tickers, rules, start_ts)
+    timings["simulate"] = time.perf_counter() - start
+
+    t = time.perf_counter()
+    summaries = [
+        _summarize(rule, [(ticker, trades[i]) for ticker, _, _, _, trades in results])
+        for i, rule in enumerate(rules)
+    ]
+    timings["aggregate"] = time.perf_counter() - t
+    timings["total"] = time.perf_counter() - start
+
+    bars = sum(n for _, n, _, _, _ in results)
+    tested = {ticker for ticker, _, _, _, _ in results}
+    return {
+        "rules": summaries,
+        "tickers": len(tested),
+        "missing": [t for t in tickers if t not in tested],
+        # The store may hold less history than the period asks for
+        "first_date": min((first for _, _, first, _, _ in results), default=None),
+        "last_date": max((last for _, _, _, last, _ in results), default=None),
+        "bars": bars,
+        # Each rule is a pass over every bar
+        "bars_per_second": round(bars * len(rules) / timings["simulate"]) if timings["simulate"] > 0 else None,
+        "timings": {k: round(v, 4) for k, v in timings.items()},
+    }
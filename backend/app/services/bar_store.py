@@ -0,0 +1,129 @@
+"""On-disk OHLCV bar store (SQLite) shared across restarts."""
+
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import NamedTuple
+
+import pandas as pd
+
+from app.db.database import DB_PATH
+
+BAR_STORE_PATH = os.getenv("BAR_STORE_PATH", os.path.join(os.path.dirname(DB_PATH) or ".", "bars.db"))
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    PRIMARY KEY (ticker, interval, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS series (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    tz TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,  -- earliest period start a full download has covered
+    last_ts INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (ticker, interval)
+);
+"""
+
+_initialized = False
+
+
+class SeriesInfo(NamedTuple):
+    tz: str
+    start_ts: int
+    last_ts: int
+    updated_at: float
+
+
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    if not _initialized:
+        os.makedirs(os.path.dirname(BAR_STORE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(BAR_STORE_PATH, timeout=30)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _initialized = True
+    return conn
+
+
+def series_info(ticker: str, interval: str) -> SeriesInfo | None:
+    """Return metadata for a stored series, or None if nothing is stored."""
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT tz, start_ts, last_ts, updated_at FROM series WHERE ticker = ? AND interval = ?",
+            (ticker, interval),
+        ).fetchone()
+    return SeriesInfo(*row) if row else None
+
+
+def load(ticker: str, interval: str, start_ts: int | None = None) -> pd.DataFrame:
+    """Load stored bars as a yfinance-shaped DataFrame (tz-aware index, OHLCV columns)."""
+    info = series_info(ticker, interval)
+    if info is None:
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            "SELECT ts, open, high, low, close, volume FROM bars "
+            "WHERE ticker = ? AND interval = ? AND ts >= ? ORDER BY ts",
+            (ticker, interval, start_ts or 0),
+        ).fetchall()
+
+    df = pd.DataFrame(rows, columns=["ts", *OHLCV_COLUMNS])
+    index = pd.to_datetime(df.pop("ts"), unit="s", utc=True).dt.tz_convert(info.tz)
+    df.index = pd.DatetimeIndex(index, name="Date" if interval[-1] in "dko" else "Datetime")
+    return df
+
+
+def save(ticker: str, interval: str, df: pd.DataFrame, start_ts: int | None = None, replace: bool = False):
+    """Upsert bars and bump the series freshness timestamp.
+
+    ``start_ts`` is the start of the period the download covered; pass it for
+    full downloads so later requests for shorter periods can be served locally.
+    ``replace`` drops the stored bars first (a re-download after a dividend or
+    split re-adjusted them); an empty ``df`` never replaces anything.
+    """
+    info = series_info(ticker, interval)
+    if df.empty and (info is None or replace):
+        return
+
+    # Keep the series' original timezone: bulk downloads align every ticker to a shared one
+    if info is not None:
+        tz = info.tz
+    else:
+        tz = str(df.index.tz) if df.index.tz is not None else "UTC"
+    rows = []
+    if not df.empty:
+        index = df.index if df.index.tz is not None else df.index.tz_localize(tz)
+        ts = index.tz_convert("UTC").as_unit("s").asi8
+        values = df[OHLCV_COLUMNS].astype(float).to_numpy()
+        rows = [(ticker, interval, int(t), *map(float, v)) for t, v in zip(ts, values)]
+
+    kept = info if not replace else None
+    last_ts = max([r[2] for r in rows] + ([kept.last_ts] if kept else []))
+    if kept is not None:
+        start_ts = kept.start_ts if start_ts is None else min(start_ts, kept.start_ts)
+    elif start_ts is None:
+        start_ts = rows[0][2]
+
+    with closing(_connect()) as conn, conn:
+        if replace:
+            conn.execute("DELETE FROM bars WHERE ticker = ? AND interval = ?", (ticker, interval))
+        conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?)",
+            (ticker, interval, tz, start_ts, last_ts, time.time()),
+        )
@@ -0,0 +1,94 @@
+"""Pieces shared by the screener and backtests: column conditions and worker pools."""
+
+import multiprocessing
+import operator
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+_CONDITION_RE = re.compile(r"^\s*([a-z_0-9]+)\s*(<=|>=|==|!=|<|>)\s*(-?\d+(?:\.\d+)?|[a-z_][a-z_0-9]*)\s*$")
+
+_pools: list["WorkerPool"] = []
+
+
+def parse_condition(expr: str, columns: list[str], column_rhs: bool = False) -> tuple[str, str, str | float]:
+    """Parse "rsi_14<30" into (field, op, value).
+
+    With ``column_rhs`` the right-hand side may also name a column, e.g.
+    "close<bb_lower". Raises ValueError on bad input.
+    """
+    m = _CONDITION_RE.match(expr)
+    if not m:
+        raise ValueError(f"Invalid condition: {expr!r}")
+    field, op, rhs = m.groups()
+    if field not in columns:
+        raise ValueError(f"Unknown column: {field}")
+    if rhs[0].isalpha() or rhs[0] == "_":
+        if not column_rhs:
+            raise ValueError(f"Invalid condition: {expr!r}")
+        if rhs not in columns:
+            raise ValueError(f"Unknown column: {rhs}")
+        return field, op, rhs
+    return field, op, float(rhs)
+
+
+def mask(frame: pd.DataFrame, conditions) -> np.ndarray:
+    """Rows of ``frame`` meeting every condition; NaN compares False, so rows missing a field drop out."""
+    result = np.ones(len(frame), dtype=bool)
+    for field, op, rhs in conditions:
+        right = frame[rhs].to_numpy() if isinstance(rhs, str) else rhs
+        result &= OPERATORS[op](frame[field].to_numpy(), right)
+    return result
+
+
+class WorkerPool:
+    """Process pool started on first use, for work split into chunks of items.
+
+    ``fn(items, *args)`` must return a list; below ``min_items`` (or with one
+    worker) it runs inline, where process start-up and pickling would cost
+    more than they save.
+    """
+
+    def __init__(self, max_workers: int, min_items: int):
+        self.max_workers = max_workers
+        self.min_items = min_items
+        self._executor: ProcessPoolExecutor | None = None
+        _pools.append(self)
+
+    def run(self, fn, items: list, *args) -> list:
+        if self.max_workers <= 1 or len(items) < self.min_items:
+            return fn(items, *args)
+
+        chunk_size = -(-len(items) // (self.max_workers * 4))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        executor = self._get_executor()
+        futures = [executor.submit(fn, chunk, *args) for chunk in chunks]
+        return [item for future in futures for item in future.result()]
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Fork from a threaded server can copy a lock held mid-acquire into the child
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def shutdown():
+    """Stop every pool's worker processes (called on application shutdown)."""
+    for pool in _pools:
+        pool.shutdown()
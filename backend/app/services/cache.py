@@ -0,0 +1,130 @@
+"""Size-bounded LRU cache with per-namespace TTLs and memory accounting."""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def estimate_size(obj: object) -> int:
+    """Approximate memory footprint in bytes (deep for DataFrames and containers)."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(estimate_size(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def parse_ttls(spec: str) -> dict[str, float]:
+    """Parse "history=14400,info=86400" into {namespace: seconds}."""
+    ttls = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, seconds = item.partition("=")
+        ttls[name.strip()] = float(seconds)
+    return ttls
+
+
+def _namespace(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+class Cache:
+    """Thread-safe LRU cache bounded by total estimated size.
+
+    Keys are ``"{namespace}:{...}"`` strings; the namespace selects the TTL and
+    groups the statistics.
+    """
+
+    def __init__(self, max_bytes: int, default_ttl: float, ttls: dict[str, float] | None = None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self._data: OrderedDict[str, tuple[object, float, int]] = OrderedDict()  # key -> (value, expiry, size)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        self._ns_counters: dict[str, dict[str, int]] = {}
+
+    def _count(self, key: str, counter: str):
+        self._counters[counter] += 1
+        ns = self._ns_counters.setdefault(_namespace(key), {"hits": 0, "misses": 0})
+        if counter in ns:
+            ns[counter] += 1
+
+    def _remove(self, key: str):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str, record: bool = True):
+        """Return the cached value or None. ``record=False`` skips hit/miss counting."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                if record:
+                    self._count(key, "misses")
+                return None
+            value, expiry, _ = entry
+            if time.time() >= expiry:
+                self._remove(key)
+                self._counters["expirations"] += 1
+                if record:
+                    self._count(key, "misses")
+                return None
+            self._data.move_to_end(key)
+            if record:
+                self._count(key, "hits")
+            return value
+
+    def set(self, key: str, value: object, ttl: float | None = None):
+        if ttl is None:
+            ttl = self.ttls.get(_namespace(key), self.default_ttl)
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._data[key] = (value, time.time() + ttl, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Drop every key starting with ``prefix``. Returns the number removed."""
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                self._remove(k)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces: dict[str, dict] = {
+                ns: {"entries": 0, "bytes": 0, **counters} for ns, counters in self._ns_counters.items()
+            }
+            for key, (_, _, size) in self._data.items():
+                ns = namespaces.setdefault(_namespace(key), {"entries": 0, "bytes": 0, "hits": 0, "misses": 0})
+                ns["entries"] += 1
+                ns["bytes"] += size
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                "namespaces": namespaces,
+            }
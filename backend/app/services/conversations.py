@@ -0,0 +1,179 @@
+"""Persistent chat history with a hot in-memory LRU and a token-budgeted prompt window.
+
+Turns are stored in SQLite, so conversations survive restarts and are shared
+between uvicorn workers. Each worker keeps recently used conversations in an
+LRU and revalidates it against the conversation's ``updated_at``. Stored user
+turns keep the message and its indicator context block apart, so only the
+newest context block goes back to the model.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from app.db.database import SessionLocal
+from app.db.models import Conversation, ConversationMessage
+
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "128"))  # hot conversations per worker
+CONVERSATION_IDLE_DAYS = float(os.getenv("CONVERSATION_IDLE_DAYS", "7"))
+LLM_HISTORY_TOKENS = int(os.getenv("LLM_HISTORY_TOKENS", "8000"))  # prompt budget for history + new turn
+PURGE_INTERVAL = 3600  # seconds between expired-conversation sweeps
+OMITTED_NOTE = "（これより前の会話は省略されています）\n\n"  # constant, so the trimmed prefix stays cacheable
+
+_lock = threading.Lock()
+# {conversation_id: (updated_at, [{"role", "content", "context"}])}
+_cache: OrderedDict[str, tuple[datetime, list[dict]]] = OrderedDict()
+_last_purge = 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ~4 ASCII chars or ~1 CJK char per token, erring high."""
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def _idle_cutoff() -> datetime:
+    return datetime.now() - timedelta(days=CONVERSATION_IDLE_DAYS)
+
+
+def _remember(conversation_id: str, updated_at: datetime, messages: list[dict]):
+    with _lock:
+        _cache[conversation_id] = (updated_at, messages)
+        _cache.move_to_end(conversation_id)
+        while len(_cache) > CONVERSATION_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _forget(conversation_id: str):
+    with _lock:
+        _cache.pop(conversation_id, None)
+
+
+def load(conversation_id: str) -> list[dict]:
+    """Stored turns of a conversation, oldest first. Unknown or expired ids load as empty."""
+    with SessionLocal() as db:
+        updated_at = db.scalar(select(Conversation.updated_at).where(Conversation.id == conversation_id))
+        if updated_at is None:
+            return []
+        if updated_at < _idle_cutoff():
+            _delete(db, [conversation_id])
+            db.commit()
+            _forget(conversation_id)
+            return []
+
+        with _lock:
+            cached = _cache.get(conversation_id)
+            if cached is not None and cached[0] == updated_at:
+                _cache.move_to_end(conversation_id)
+                return list(cached[1])
+
+        rows = db.execute(
+            select(ConversationMessage.role, ConversationMessage.content, ConversationMessage.context)
+            .where(ConversationMessage.conversation_id == conversation_id)
+            .order_by(ConversationMessage.id)
+        )
+        messages = [{"role": role, "content": content, "context": context} for role, content, context in rows]
+
+    _remember(conversation_id, updated_at, messages)
+    return list(messages)
+
+
+def append_turn(conversation_id: str, message: str, context: str, reply: str):
+    """Persist a completed user/assistant exchange."""
+    now = datetime.now()
+    user = {"role": "user", "content": message, "context": context or None}
+    assistant = {"role": "assistant", "content": reply, "context": None}
+
+    with SessionLocal() as db:
+        conversation = db.get(Conversation, conversation_id)
+        previous = None
+        if conversation is None:
+            db.add(Conversation(id=conversation_id, created_at=now, updated_at=now))
+        else:
+            previous = conversation.updated_at
+            conversation.updated_at = now
+        db.add_all(
+            [ConversationMessage(conversation_id=conversation_id, created_at=now, **m) for m in (user, assistant)]
+        )
+        db.commit()
+
+    with _lock:
+        cached = _cache.get(conversation_id)
+    # Extend the cached copy only if it was current; otherwise the next load rereads
+    if previous is None:
+        _remember(conversation_id, now, [user, assistant])
+    elif cached is not None and cached[0] == previous:
+        _remember(conversation_id, now, cached[1] + [user, assistant])
+
+    purge_expired()
+
+
+def _delete(db, conversation_ids: list[str]):
+    db.execute(delete(ConversationMessage).where(ConversationMessage.conversation_id.in_(conversation_ids)))
+    db.execute(delete(Conversation).where(Conversation.id.in_(conversation_ids)))
+
+
+def purge_expired(force: bool = False) -> int:
+    """Delete conversations idle longer than CONVERSATION_IDLE_DAYS. Runs at most hourly unless forced."""
+    global _last_purge
+    if not force and time.monotonic() - _last_purge < PURGE_INTERVAL:
+        return 0
+    _last_purge = time.monotonic()
+
+    with SessionLocal() as db:
+        expired = list(db.scalars(select(Conversation.id).where(Conversation.updated_at < _idle_cutoff())))
+        if expired:
+            _delete(db, expired)
+            db.commit()
+    for conversation_id in expired:
+        _forget(conversation_id)
+    return len(expired)
+
+
+def _with_context(content: str, context: str | None) -> str:
+    return f"{context}\n\n---\n\n{content}" if context else content
+
+
+def window(history: list[dict], message: str, context: str, budget: int | None = None) -> list[dict]:
+    """Provider messages for ``history`` plus the new turn, within ``budget`` tokens.
+
+    Only the newest indicator context is sent, on the new turn: its own if it
+    has one, otherwise the latest stored one. Older context blocks describe
+    stale prices and are dropped. When the history outgrows the budget, the
+    oldest exchanges are dropped until it fits in half of it, and a fixed note
+    tells the model that earlier turns were omitted. The cut stays put until
+    the history overflows again, so the prefix sent is the same from turn to
+    turn and provider prompt caches keep hitting. The new turn is always sent.
+    """
+    budget = LLM_HISTORY_TOKENS if budget is None else budget
+
+    if not context:
+        context = next((m["context"] for m in reversed(history) if m["context"]), "")
+    turns = [{"role": m["role"], "content": m["content"]} for m in history]
+    current = {"role": "user", "content": _with_context(message, context)}
+
+    # Exchanges are user/assistant pairs, dropped whole so roles keep alternating
+    costs = [
+        estimate_tokens(turns[i]["content"]) + estimate_tokens(turns[i + 1]["content"])
+        for i in range(0, len(turns) - 1, 2)
+    ]
+    # Replay the history's growth: the cut only moves when it overflows
+    start = used = 0
+    for cost in costs:
+        used += cost
+        if used > budget:
+            while used > budget // 2:
+                used -= costs[start]
+                start += 1
+    current_cost = estimate_tokens(current["content"])
+    while start < len(costs) and used + current_cost > budget:
+        used -= costs[start]
+        start += 1
+
+    messages = turns[2 * start:] + [current]
+    if start > 0:
+        messages[0]["content"] = OMITTED_NOTE + messages[0]["content"]
+    return messages
@@ -0,0 +1,186 @@
+"""Durable background queue for Obsidian trade journal writes.
+
+Routers add a ``JournalJob`` row in the same transaction as the trade change
+and return once it commits. A worker task drains the table off the request
+path: jobs for the same trade are coalesced into one write of the trade's
+current state, and each note is written atomically. Jobs survive restarts,
+and failed ones are retried with the next pass.
+
+``reconcile()`` (also ``python -m app.reconcile``) syncs every trade at once.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.database import SessionLocal
+from app.db.models import JournalJob, Trade
+from app.services import obsidian, stock_data, technical, vault_index
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_POLL_SECONDS = float(os.getenv("JOURNAL_POLL_SECONDS", "30"))  # retry cadence for failed jobs
+JOURNAL_MAX_ATTEMPTS = int(os.getenv("JOURNAL_MAX_ATTEMPTS", "5"))
+
+_task: asyncio.Task | None = None
+_wakeup: asyncio.Event | None = None
+
+
+def enqueue(db: Session | AsyncSession, trade: Trade, action: str):
+    """Add a journal job to ``db``'s transaction; the caller commits, then calls notify()."""
+    db.add(JournalJob(trade_id=trade.id, action=action))
+
+
+def _entry_indicators(trade: Trade) -> dict | None:
+    """Indicators as of the entry date, even when the job runs later."""
+    try:
+        df = stock_data.get_history(trade.ticker, period="6mo")
+    except Exception:
+        logger.warning("Indicators unavailable for %s journal", trade.ticker, exc_info=True)
+        return None
+    if df.empty:
+        return None
+    df = df[df.index < pd.Timestamp(trade.entry_date + pd.Timedelta(days=1), tz=df.index.tz)]
+    return technical.calculate_indicators(df) or None
+
+
+def _desired_note(trade: Trade, path: Path | None, indicators_fn) -> tuple[Path, str, str | None]:
+    """(path, desired content, current content or None) for a trade's note.
+
+    An existing note only has the trade's state applied, so edits made in
+    Obsidian are kept; a missing one is rendered from scratch.
+    """
+    if path is not None and path.exists():
+        current = path.read_text(encoding="utf-8")
+        return path, obsidian.apply_trade_state(current, trade), current
+    path = obsidian.trade_note_path(trade.ticker, trade.entry_date, trade.id)
+    return path, obsidian.render_trade_journal(trade, indicators_fn(trade)), None
+
+
+def _sync_note(trade: Trade):
+    index = vault_index.get_index()
+    path = index.find(trade)
+    if path is None or not path.exists():
+        index.refresh(force=True)
+        path = index.find(trade)
+
+    path, content, current = _desired_note(trade, path, _entry_indicators)
+    if content != current:
+        obsidian.write_atomic(path, content)
+        index.record(path, content)
+
+
+def reconcile() -> dict:
+    """Bring every trade's note in line with the database in one pass.
+
+    Existing notes keep their body and user frontmatter keys; missing notes
+    are created without entry indicators (no network access). Only notes
+    whose content changes are written.
+    """
+    start = time.perf_counter()
+    index = vault_index.get_index()
+    scan = index.refresh(force=True)
+    counts = {"trades": 0, "created": 0, "updated": 0, "unchanged": 0}
+
+    with SessionLocal() as db:
+        trades = db.query(Trade).order_by(Trade.id).all()
+    for trade in trades:
+        counts["trades"] += 1
+        path, content, current = _desired_note(trade, index.find(trade), lambda _: None)
+        if content == current:
+            counts["unchanged"] += 1
+            continue
+        obsidian.write_atomic(path, content)
+        index.record(path, content, save=False)
+        counts["created" if current is None else "updated"] += 1
+    index.save()
+
+    return {**counts, "scan": scan, "elapsed": round(time.perf_counter() - start, 3)}
+
+
+def process_pending() -> int:
+    """Write every note with pending jobs once. Returns the number of notes written."""
+    with SessionLocal() as db:
+        jobs = (
+            db.query(JournalJob)
+            .filter(JournalJob.attempts < JOURNAL_MAX_ATTEMPTS)
+            .order_by(JournalJob.id)
+            .all()
+        )
+        by_trade: dict[int, list[JournalJob]] = defaultdict(list)
+        for job in jobs:
+            by_trade[job.trade_id].append(job)
+
+        written = 0
+        for trade_id, trade_jobs in by_trade.items():
+            trade = db.get(Trade, trade_id)
+            try:
+                if trade is not None:
+                    _sync_note(trade)
+                    written += 1
+            except Exception as e:
+                logger.exception("Journal write failed for trade %s", trade_id)
+                for job in trade_jobs:
+                    job.attempts += 1
+                    job.last_error = str(e)
+            else:
+                for job in trade_jobs:
+                    db.delete(job)
+            db.commit()
+    return written
+
+
+def status() -> dict:
+    with SessionLocal() as db:
+        pending = db.query(JournalJob).filter(JournalJob.attempts < JOURNAL_MAX_ATTEMPTS).count()
+        failed = [
+            {"trade_id": j.trade_id, "action": j.action, "attempts": j.attempts, "error": j.last_error}
+            for j in db.query(JournalJob).filter(JournalJob.attempts >= JOURNAL_MAX_ATTEMPTS).order_by(JournalJob.id)
+        ]
+    return {"running": _task is not None and not _task.done(), "pending": pending, "failed": failed}
+
+
+def notify():
+    """Wake the worker after committing new jobs."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def _loop():
+    while True:
+        _wakeup.clear()
+        try:
+            await asyncio.to_thread(process_pending)
+        except Exception:
+            logger.exception("Journal queue pass failed")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), JOURNAL_POLL_SECONDS)
+        except TimeoutError:
+            pass
+
+
+def start():
+    """Start the worker; jobs left over from a previous run are processed first."""
+    global _task, _wakeup
+    if _task is None:
+        _wakeup = asyncio.Event()
+        _task = asyncio.create_task(_loop())
+
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
@@ -3,21 +3,61 @@
 Supports multiple providers via LLM_PROVIDER env var:
 - "gemini" (default): Google Gemini API
 - "anthropic": Anthropic Claude API
+- "stub": canned offline replies, for tests and batch dry runs
 """
 
+import asyncio
+import hashlib
+import logging
 import os
+import random
+import time
+import unicodedata
 import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
 
 import anthropic
+import httpx
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types
 
-# In-memory conversation store: {conversation_id: [messages]}
-_conversations: dict[str, list[dict]] = {}
+from app.services import conversations, stock_data
 
-_anthropic_client: anthropic.Anthropic | None = None
+try:  # google-genai makes async calls over aiohttp when it is installed
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+_anthropic_client: anthropic.AsyncAnthropic | None = None
 _gemini_client: genai.Client | None = None
 
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # in-flight requests per provider
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))  # seconds, per request including retries
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = 1.0  # seconds; doubled per attempt, plus jitter
+# Reuse first-turn answers for identical (normalized) questions on the same
+# indicator snapshot; entries expire when the ticker gets new bars
+LLM_ANSWER_CACHE = os.getenv("LLM_ANSWER_CACHE", "0") == "1"
+LLM_STUB_DELAY = float(os.getenv("LLM_STUB_DELAY", "0.2"))  # simulated latency of the stub provider
+
+# HTTP statuses worth retrying: rate limited, server errors, Anthropic "overloaded"
+_TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504, 529}
+# Connection failures and timeouts google-genai lets through from its HTTP client;
+# TimeoutError is aiohttp's socket timeout (the LLM_TIMEOUT deadline cancels instead)
+_TRANSIENT_ERRORS: tuple[type[Exception], ...] = (httpx.TransportError, httpx.TimeoutException, TimeoutError)
+if aiohttp is not None:
+    _TRANSIENT_ERRORS += (aiohttp.ClientError,)
+
+_semaphores: dict[str, asyncio.Semaphore] = {}
+
+USAGE_HISTORY = 100  # recent calls kept for usage_stats()
+_usage_calls: deque[dict] = deque(maxlen=USAGE_HISTORY)
+_usage_totals: dict[str, dict[str, int]] = {}
+
 SYSTEM_PROMPT = """あなたは株式スイングトレード（数日〜数週間の短中期売買）の分析アシスタントです。
 
 ## 役割
@@ -46,13 +86,14 @@ def get_provider() -> str:
     return os.getenv("LLM_PROVIDER", "gemini").lower()
 
 
-def _get_anthropic_client() -> anthropic.Anthropic:
+def _get_anthropic_client() -> anthropic.AsyncAnthropic:
     global _anthropic_client
     if _anthropic_client is None:
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY is not set")
-        _anthropic_client = anthropic.Anthropic(api_key=api_key)
+        # Retries are handled by _with_retries so they share the request deadline
+        _anthropic_client = anthropic.AsyncAnthropic(api_key=api_key, max_retries=0, timeout=LLM_TIMEOUT)
     return _anthropic_client
 
 
@@ -62,10 +103,100 @@ def _get_gemini_client() -> genai.Client:
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY is not set")
-        _gemini_client = genai.Client(api_key=api_key)
+        _gemini_client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(timeout=int(LLM_TIMEOUT * 1000)),
+        )
     return _gemini_client
 
 
+def _semaphore(provider: str) -> asyncio.Semaphore:
+    if provider not in _semaphores:
+        _semaphores[provider] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphores[provider]
+
+
+def _is_transient(e: Exception) -> bool:
+    if isinstance(e, anthropic.APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(e, anthropic.APIStatusError):
+        return e.status_code in _TRANSIENT_STATUSES
+    if isinstance(e, genai_errors.APIError):
+        return e.code in _TRANSIENT_STATUSES
+    return isinstance(e, _TRANSIENT_ERRORS)
+
+
+def _backoff(attempt: int) -> float:
+    return LLM_RETRY_BASE_DELAY * 2**attempt + random.uniform(0, LLM_RETRY_BASE_DELAY)
+
+
+def _record_usage(provider: str, model: str, **tokens: int):
+    """Record one call's token usage. ``input_tokens`` excludes cache reads and writes."""
+    _usage_calls.append({"provider": provider, "model": model, "at": time.time(), **tokens})
+    totals = _usage_totals.setdefault(provider, {"calls": 0})
+    totals["calls"] += 1
+    for key, value in tokens.items():
+        totals[key] = totals.get(key, 0) + value
+    logger.debug("%s %s usage: %s", provider, model, tokens)
+
+
+def usage_stats() -> dict:
+    """Token totals per provider (with the share of prompt tokens read from cache) and recent calls."""
+    providers = {}
+    for provider, totals in _usage_totals.items():
+        prompt = totals.get("input_tokens", 0) + totals.get("cached_tokens", 0) + totals.get("cache_write_tokens", 0)
+        cached_ratio = round(totals.get("cached_tokens", 0) / prompt, 4) if prompt else 0.0
+        providers[provider] = {**totals, "cached_ratio": cached_ratio}
+    return {"providers": providers, "recent": list(_usage_calls)}
+
+
+async def _with_retries(provider: str, call: Callable[[], Awaitable[str]]) -> str:
+    """Await call() under the provider's concurrency limit, deadline and retry policy.
+
+    Raises TimeoutError when LLM_TIMEOUT elapses (queueing and backoff included).
+    """
+    attempt = 0
+    async with asyncio.timeout(LLM_TIMEOUT):
+        while True:
+            try:
+                async with _semaphore(provider):
+                    return await call()
+            except Exception as e:
+                # The last attempt, or a permanent error, propagates as is
+                if attempt == LLM_MAX_RETRIES or not _is_transient(e):
+                    raise
+            await asyncio.sleep(_backoff(attempt))
+            attempt += 1
+
+
+async def _stream_with_retries(provider: str, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+    """Relay chunks from open_stream() with the same limits as _with_retries.
+
+    A transient failure is retried only before the first chunk; once text has
+    been relayed the error propagates. The deadline is checked between chunks,
+    and the SDK's own HTTP timeout bounds a single stalled read.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + LLM_TIMEOUT
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        started = False
+        try:
+            async with _semaphore(provider):
+                async for text in open_stream():
+                    if loop.time() > deadline:
+                        raise TimeoutError(f"LLM response exceeded {LLM_TIMEOUT:.0f}s")
+                    started = True
+                    yield text
+            return
+        except Exception as e:
+            if started or attempt == LLM_MAX_RETRIES or not _is_transient(e):
+                raise
+        delay = _backoff(attempt)
+        if loop.time() + delay > deadline:
+            raise TimeoutError(f"LLM response exceeded {LLM_TIMEOUT:.0f}s")
+        await asyncio.sleep(delay)
+
+
 def build_context(ticker: str | None = None, indicators: dict | None = None, trade_stats: dict | None = None) -> str:
     """Build contextual data string to prepend to user message."""
     parts = []
@@ -94,96 +225,254 @@ def build_context(ticker: str | None = None, indicators: dict | None = None, tra
     return "\n".join(parts)
 
 
-def _chat_anthropic(
-    message: str,
-    conversation_id: str,
-    context: str,
-    model: str,
-) -> str:
-    """Send a message via Anthropic Claude API."""
-    client = _get_anthropic_client()
+def _gemini_contents(messages: list[dict]) -> list[types.Content]:
+    """Convert common-format messages to Gemini contents."""
+    contents = []
+    for msg in messages:
+        role = "model" if msg["role"] == "assistant" else msg["role"]
+        contents.append(types.Content(role=role, parts=[types.Part.from_text(text=msg["content"])]))
+    return contents
 
-    full_message = f"{context}\n\n---\n\n{message}" if context else message
-    _conversations[conversation_id].append({"role": "user", "content": full_message})
 
-    response = client.messages.create(
-        model=model,
-        max_tokens=2048,
-        system=SYSTEM_PROMPT,
-        messages=_conversations[conversation_id],
+def _anthropic_request(messages: list[dict], model: str) -> dict:
+    """Request kwargs with cache breakpoints on the system prompt and the history prefix.
+
+    The history as sent now is re-sent verbatim on the next turn: context
+    blocks only ride on the newest turn, and ``conversations.window`` keeps
+    its cut and omission note fixed until the history overflows again. Marking
+    the last history message therefore lets the next request read everything
+    before the new turn from the cache.
+    """
+    messages = list(messages)
+    if len(messages) > 1:
+        last = messages[-2]
+        messages[-2] = {
+            "role": last["role"],
+            "content": [{"type": "text", "text": last["content"], "cache_control": {"type": "ephemeral"}}],
+        }
+    return {
+        "model": model,
+        "max_tokens": 2048,
+        "system": [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+        "messages": messages,
+    }
+
+
+def _record_anthropic_usage(model: str, usage):
+    _record_usage(
+        "anthropic",
+        model,
+        input_tokens=usage.input_tokens,
+        cached_tokens=usage.cache_read_input_tokens or 0,
+        cache_write_tokens=usage.cache_creation_input_tokens or 0,
+        output_tokens=usage.output_tokens,
     )
 
-    assistant_text = response.content[0].text
-    _conversations[conversation_id].append({"role": "assistant", "content": assistant_text})
-    return assistant_text
 
+def _record_gemini_usage(model: str, usage: types.GenerateContentResponseUsageMetadata | None):
+    if usage is None:
+        return
+    cached = usage.cached_content_token_count or 0
+    _record_usage(
+        "gemini",
+        model,
+        input_tokens=(usage.prompt_token_count or 0) - cached,
+        cached_tokens=cached,
+        cache_write_tokens=0,
+        output_tokens=usage.candidates_token_count or 0,
+    )
 
-def _chat_gemini(
-    message: str,
-    conversation_id: str,
-    context: str,
-    model: str,
-) -> str:
-    """Send a message via Google Gemini API."""
+
+def _gemini_config() -> types.GenerateContentConfig:
+    # Gemini 2.5 caches repeated prompt prefixes implicitly; keeping the system
+    # instruction and history byte-identical between turns is what makes it hit
+    return types.GenerateContentConfig(system_instruction=SYSTEM_PROMPT, max_output_tokens=2048)
+
+
+async def _chat_anthropic(messages: list[dict], model: str) -> str:
+    """Send a conversation via Anthropic Claude API."""
+    client = _get_anthropic_client()
+    response = await client.messages.create(**_anthropic_request(messages, model))
+    _record_anthropic_usage(model, response.usage)
+    return response.content[0].text
+
+
+async def _chat_gemini(messages: list[dict], model: str) -> str:
+    """Send a conversation via Google Gemini API."""
     client = _get_gemini_client()
+    response = await client.aio.models.generate_content(
+        model=model,
+        contents=_gemini_contents(messages),
+        config=_gemini_config(),
+    )
+    _record_gemini_usage(model, response.usage_metadata)
+    return response.text
 
-    full_message = f"{context}\n\n---\n\n{message}" if context else message
 
-    # Convert existing conversation history to Gemini format
-    history = []
-    for msg in _conversations[conversation_id]:
-        role = "model" if msg["role"] == "assistant" else msg["role"]
-        history.append(types.Content(role=role, parts=[types.Part.from_text(text=msg["content"])]))
+async def _stream_anthropic(messages: list[dict], model: str) -> AsyncIterator[str]:
+    """Stream a reply via Anthropic Claude API."""
+    client = _get_anthropic_client()
+    async with client.messages.stream(**_anthropic_request(messages, model)) as stream:
+        async for text in stream.text_stream:
+            yield text
+        final = await stream.get_final_message()
+    _record_anthropic_usage(model, final.usage)
 
-    response = client.models.generate_content(
+
+async def _stream_gemini(messages: list[dict], model: str) -> AsyncIterator[str]:
+    """Stream a reply via Google Gemini API."""
+    client = _get_gemini_client()
+    stream = await client.aio.models.generate_content_stream(
         model=model,
-        contents=history + [types.Content(role="user", parts=[types.Part.from_text(text=full_message)])],
-        config=types.GenerateContentConfig(
-            system_instruction=SYSTEM_PROMPT,
-            max_output_tokens=2048,
-        ),
+        contents=_gemini_contents(messages),
+        config=_gemini_config(),
     )
+    usage = None
+    async for chunk in stream:
+        usage = chunk.usage_metadata or usage
+        if chunk.text:
+            yield chunk.text
+    _record_gemini_usage(model, usage)
 
-    assistant_text = response.text
-    # Store in common format for consistency
-    _conversations[conversation_id].append({"role": "user", "content": full_message})
-    _conversations[conversation_id].append({"role": "assistant", "content": assistant_text})
-    return assistant_text
+
+def _get_stub_client() -> None:
+    return None
+
+
+def _stub_reply(messages: list[dict]) -> str:
+    prompt = messages[-1]["content"]
+    lines = [line for line in prompt.splitlines() if line.startswith("- ")]
+    return "\n".join(["[stub] 受け取ったデータ:", *lines, "", f"質問: {prompt.rsplit('---', 1)[-1].strip()}"])
+
+
+async def _chat_stub(messages: list[dict], model: str) -> str:
+    """Canned reply after LLM_STUB_DELAY seconds, without network access."""
+    await asyncio.sleep(LLM_STUB_DELAY)
+    _record_usage("stub", model, input_tokens=sum(conversations.estimate_tokens(m["content"]) for m in messages),
+                  cached_tokens=0, cache_write_tokens=0, output_tokens=0)
+    return _stub_reply(messages)
+
+
+async def _stream_stub(messages: list[dict], model: str) -> AsyncIterator[str]:
+    for line in (await _chat_stub(messages, model)).splitlines(keepends=True):
+        yield line
 
 
 # Default models per provider
 _DEFAULT_MODELS = {
     "anthropic": "claude-sonnet-4-5-20250929",
     "gemini": "gemini-2.5-flash",
+    "stub": "stub",
 }
 
+_PROVIDERS = {
+    "anthropic": (_get_anthropic_client, _chat_anthropic, _stream_anthropic),
+    "gemini": (_get_gemini_client, _chat_gemini, _stream_gemini),
+    "stub": (_get_stub_client, _chat_stub, _stream_stub),
+}
 
-def chat(
-    message: str,
-    conversation_id: str | None = None,
-    context: str = "",
-    model: str | None = None,
-) -> tuple[str, str]:
-    """Send a message to the configured LLM and get a response.
 
-    Returns (response_text, conversation_id).
-    """
+def check_provider() -> str:
+    """The configured provider. Raises ValueError if it is unknown or its API key is missing."""
     provider = get_provider()
+    if provider not in _PROVIDERS:
+        raise ValueError(f"Unsupported LLM_PROVIDER: {provider}")
+    _PROVIDERS[provider][0]()
+    return provider
+
+
+def _answer_key(provider: str, model: str, message: str, context: str) -> str:
+    normalized = " ".join(unicodedata.normalize("NFKC", message).casefold().split())
+    return hashlib.sha256("\0".join([provider, model, normalized, context]).encode()).hexdigest()
+
+
+async def _prepare(
+    message: str,
+    conversation_id: str | None,
+    context: str,
+    model: str | None,
+) -> tuple[str, str, str, list[dict], str | None]:
+    """Validate configuration and build the request.
 
+    Returns (provider, model, conv_id, messages, answer_key); answer_key is
+    set only for the first turn of a conversation when LLM_ANSWER_CACHE is on.
+    """
+    provider = check_provider()
     if model is None:
         model = _DEFAULT_MODELS.get(provider, _DEFAULT_MODELS["gemini"])
 
+    answer_key = None
     if not conversation_id:
         conversation_id = str(uuid.uuid4())
+        history = []
+        if LLM_ANSWER_CACHE:
+            answer_key = _answer_key(provider, model, message, context)
+    else:
+        history = await asyncio.to_thread(conversations.load, conversation_id)
 
-    if conversation_id not in _conversations:
-        _conversations[conversation_id] = []
+    return provider, model, conversation_id, conversations.window(history, message, context), answer_key
 
-    if provider == "anthropic":
-        text = _chat_anthropic(message, conversation_id, context, model)
-    elif provider == "gemini":
-        text = _chat_gemini(message, conversation_id, context, model)
-    else:
-        raise ValueError(f"Unsupported LLM_PROVIDER: {provider}")
 
-    return text, conversation_id
+async def complete(message: str, context: str = "", model: str | None = None) -> str:
+    """One-off request outside any conversation (nothing is stored)."""
+    provider, model, _, messages, _ = await _prepare(message, "", context, model)
+    call = _PROVIDERS[provider][1]
+    return await _with_retries(provider, lambda: call(messages, model))
+
+
+async def chat(
+    message: str,
+    conversation_id: str | None = None,
+    context: str = "",
+    model: str | None = None,
+    ticker: str | None = None,
+) -> tuple[str, str, bool]:
+    """Send a message to the configured LLM and get a response.
+
+    ``ticker`` scopes the first-turn answer cache, so new bars for it expire
+    cached answers. Returns (response_text, conversation_id, from_cache).
+    """
+    provider, model, conversation_id, messages, answer_key = await _prepare(message, conversation_id, context, model)
+    text = stock_data.cached_answer(ticker, answer_key) if answer_key else None
+    cached = text is not None
+    if not cached:
+        call = _PROVIDERS[provider][1]
+        text = await _with_retries(provider, lambda: call(messages, model))
+        if answer_key:
+            stock_data.cache_answer(ticker, answer_key, text)
+    await asyncio.to_thread(conversations.append_turn, conversation_id, message, context, text)
+    return text, conversation_id, cached
+
+
+async def chat_stream(
+    message: str,
+    conversation_id: str | None = None,
+    context: str = "",
+    model: str | None = None,
+    ticker: str | None = None,
+) -> tuple[AsyncIterator[str], str, bool]:
+    """Like chat(), but returns (async text chunk iterator, conversation_id, from_cache).
+
+    Configuration errors (unknown provider, missing API key) raise ValueError
+    here, before any chunk is produced. The conversation history is only
+    updated once the iterator is exhausted. A cached answer is yielded whole.
+    """
+    provider, model, conversation_id, messages, answer_key = await _prepare(message, conversation_id, context, model)
+    hit = stock_data.cached_answer(ticker, answer_key) if answer_key else None
+    open_stream = _PROVIDERS[provider][2]
+
+    async def chunks() -> AsyncIterator[str]:
+        if hit is not None:
+            yield hit
+            text = hit
+        else:
+            parts = []
+            async for part in _stream_with_retries(provider, lambda: open_stream(messages, model)):
+                parts.append(part)
+                yield part
+            text = "".join(parts)
+            if answer_key:
+                stock_data.cache_answer(ticker, answer_key, text)
+        await asyncio.to_thread(conversations.append_turn, conversation_id, message, context, text)
+
+    return chunks(), conversation_id, hit is not None
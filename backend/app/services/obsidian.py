@@ -1,65 +1,117 @@
-"""Obsidian trade journal writer."""
+"""Obsidian trade journal and report notes."""
 
 import os
+import tempfile
 from datetime import date
 from pathlib import Path
 
 VAULT_PATH = os.getenv("OBSIDIAN_VAULT_PATH", "/mnt/e/workspace/obsidian-vault")
 TRADE_DIR = "Fleeting Notes/trades"
+REPORT_DIR = "Fleeting Notes/reports"
 
 
-def write_trade_journal(
-    ticker: str,
-    direction: str,
-    entry_date: date,
-    entry_price: float,
-    entry_reason: str,
-    target_price: float | None = None,
-    stop_loss: float | None = None,
-    indicators: dict | None = None,
-    tags: list[str] | None = None,
-) -> str:
-    """Write a trade journal entry to Obsidian vault.
-
-    Returns the file path of the created note.
-    """
-    trade_dir = Path(VAULT_PATH) / TRADE_DIR
-    trade_dir.mkdir(parents=True, exist_ok=True)
+def trade_note_path(ticker: str, entry_date: date, trade_id: int) -> Path:
+    """Path for a new trade note; the id keeps same-day trades in one ticker apart."""
+    filename = f"trade-{entry_date.isoformat()}-{ticker.replace('.', '_')}-{trade_id}.md"
+    return Path(VAULT_PATH) / TRADE_DIR / filename
 
-    filename = f"trade-{entry_date.isoformat()}-{ticker.replace('.', '_')}.md"
-    filepath = trade_dir / filename
 
-    all_tags = ["trade", direction]
-    if tags:
-        all_tags.extend(tags)
-    tags_str = ", ".join(f'"{t}"' for t in all_tags)
+def legacy_trade_note_name(ticker: str, entry_date: date) -> str:
+    """Filename used before notes carried the trade id."""
+    return f"trade-{entry_date.isoformat()}-{ticker.replace('.', '_')}.md"
 
-    lines = [
-        "---",
-        f'id: "trade-{entry_date.isoformat()}-{ticker}"',
-        "type: trade-journal",
-        f'ticker: "{ticker}"',
-        f"direction: {direction}",
-        f"entry_date: {entry_date.isoformat()}",
-        f"entry_price: {entry_price}",
-    ]
 
-    if target_price is not None:
-        lines.append(f"target_price: {target_price}")
-    if stop_loss is not None:
-        lines.append(f"stop_loss: {stop_loss}")
+def parse_frontmatter(content: str) -> tuple[dict[str, str], str]:
+    """Split a note into (raw frontmatter values by key, body).
 
-    lines.extend([
-        "status: open",
-        f"tags: [{tags_str}]",
-        "---",
-        "",
-        f"# {ticker} {direction.upper()} @{entry_price}",
+    Values are kept as written, so unknown keys survive a rewrite unchanged.
+    Lines that are not ``key: value`` are kept under their full text with an
+    empty-string sentinel key prefix.
+    """
+    if not content.startswith("---\n"):
+        return {}, content
+    end = content.find("\n---\n", 3)
+    if end == -1:
+        return {}, content
+
+    fields: dict[str, str] = {}
+    for i, line in enumerate(content[4:end].split("\n")):
+        key, sep, value = line.partition(":")
+        if sep and key and not key.startswith((" ", "-")):
+            fields[key.strip()] = value.strip()
+        else:
+            fields[f"\0{i}"] = line
+    return fields, content[end + 5:]
+
+
+def render_frontmatter(fields: dict[str, str]) -> str:
+    lines = [value if key.startswith("\0") else f"{key}: {value}" for key, value in fields.items()]
+    return "\n".join(["---", *lines, "---", ""])
+
+
+def frontmatter_value(raw: str | None) -> str | None:
+    """Unquoted scalar value of a raw frontmatter entry."""
+    if raw is None:
+        return None
+    return raw[1:-1] if len(raw) >= 2 and raw[0] == raw[-1] and raw[0] in "\"'" else raw
+
+
+def trade_frontmatter(trade) -> dict[str, str]:
+    """Frontmatter fields owned by the database row (others are left to the user)."""
+    fields = {
+        "trade_id": str(trade.id),
+        "type": "trade-journal",
+        "ticker": f'"{trade.ticker}"',
+        "direction": trade.direction,
+        "entry_date": trade.entry_date.isoformat(),
+        "entry_price": str(trade.entry_price),
+        "target_price": trade.target_price,
+        "stop_loss": trade.stop_loss,
+        "status": trade.status,
+        "exit_date": trade.exit_date.isoformat() if trade.exit_date else None,
+        "exit_price": trade.exit_price,
+        "pnl": round(trade.pnl, 2) if trade.pnl is not None else None,
+        "pnl_pct": round(trade.pnl_pct, 2) if trade.pnl_pct is not None else None,
+    }
+    return {k: str(v) for k, v in fields.items() if v is not None}
+
+
+def write_atomic(filepath: Path, content: str):
+    """Write via a temp file in the same directory and rename it over the target.
+
+    Obsidian and sync tools never see a half-written note, and a crash leaves
+    either the old or the new content.
+    """
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filepath)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def render_trade_journal(trade, indicators: dict | None = None) -> str:
+    """Markdown for a new trade journal entry."""
+    all_tags = ["trade", trade.direction]
+    if trade.tags:
+        all_tags.extend(trade.tags)
+    tags_str = ", ".join(f'"{t}"' for t in all_tags)
+
+    fields = {"id": f'"trade-{trade.entry_date.isoformat()}-{trade.ticker}-{trade.id}"', **trade_frontmatter(trade)}
+    fields["tags"] = f"[{tags_str}]"
+
+    lines = [
+        f"# {trade.ticker} {trade.direction.upper()} @{trade.entry_price}",
         "",
         "## エントリー根拠",
-        entry_reason or "(未記入)",
+        trade.entry_reason or "(未記入)",
         "",
-    ])
+    ]
 
     if indicators:
         lines.extend([
@@ -77,42 +129,80 @@ def write_trade_journal(
         "",
     ])
 
-    filepath.write_text("\n".join(lines), encoding="utf-8")
-    return str(filepath)
+    return apply_trade_state(render_frontmatter(fields) + "\n" + "\n".join(lines), trade)
 
 
-def update_trade_close(
-    ticker: str,
-    entry_date: date,
-    exit_date: date,
-    exit_price: float,
-    exit_reason: str,
-    pnl: float,
-    pnl_pct: float,
-) -> str | None:
-    """Update an existing trade journal with close information."""
-    trade_dir = Path(VAULT_PATH) / TRADE_DIR
-    filename = f"trade-{entry_date.isoformat()}-{ticker.replace('.', '_')}.md"
-    filepath = trade_dir / filename
-
-    if not filepath.exists():
-        return None
+def apply_trade_state(content: str, trade) -> str:
+    """Bring an existing note in line with the trade row, keeping the user's edits.
 
-    content = filepath.read_text(encoding="utf-8")
+    Database-owned frontmatter fields are updated in place; other keys and the
+    body are kept. Once the trade is closed, the retrospective placeholder is
+    filled in. Applying it twice is a no-op.
+    """
+    fields, body = parse_frontmatter(content)
+    fields.update(trade_frontmatter(trade))
+    content = render_frontmatter(fields) + body
 
-    # Update frontmatter status
-    content = content.replace("status: open", f"status: closed")
+    if trade.status != "closed":
+        return content
 
     # Update retrospective section
     old_retro = "- P/L: \n- 学び: "
-    pnl_sign = "+" if pnl >= 0 else ""
+    pnl_sign = "+" if trade.pnl >= 0 else ""
     new_retro = (
-        f"- P/L: {pnl_sign}{pnl:.0f}円 ({pnl_sign}{pnl_pct:.1f}%)\n"
-        f"- 決済日: {exit_date.isoformat()} @{exit_price}\n"
-        f"- 決済理由: {exit_reason}\n"
+        f"- P/L: {pnl_sign}{trade.pnl:.0f}円 ({pnl_sign}{trade.pnl_pct:.1f}%)\n"
+        f"- 決済日: {trade.exit_date.isoformat()} @{trade.exit_price}\n"
+        f"- 決済理由: {trade.exit_reason or ''}\n"
         f"- 学び: "
     )
-    content = content.replace(old_retro, new_retro)
+    return content.replace(old_retro, new_retro, 1)
+
+
+def write_ticker_analysis(ticker: str, report_date: date, analysis: str, indicators: dict | None = None) -> str:
+    """Write one ticker's AI analysis from a watchlist report. Returns the file path."""
+    report_dir = Path(VAULT_PATH) / REPORT_DIR
+    report_dir.mkdir(parents=True, exist_ok=True)
+    filepath = report_dir / f"analysis-{report_date.isoformat()}-{ticker.replace('.', '_')}.md"
 
-    filepath.write_text(content, encoding="utf-8")
+    lines = [
+        "---",
+        f'id: "analysis-{report_date.isoformat()}-{ticker}"',
+        "type: ai-analysis",
+        f'ticker: "{ticker}"',
+        f"date: {report_date.isoformat()}",
+        'tags: ["analysis", "ai"]',
+        "---",
+        "",
+        f"# {ticker} AI分析 ({report_date.isoformat()})",
+        "",
+    ]
+    if indicators:
+        lines.append("## テクニカル状況")
+        for key, value in indicators.items():
+            if key != "date":
+                lines.append(f"- {key}: {value}")
+        lines.append("")
+    lines.extend(["## 分析", analysis, ""])
+
+    write_atomic(filepath, "\n".join(lines))
+    return str(filepath)
+
+
+def write_watchlist_report(report_date: date, content: str) -> str:
+    """Write the consolidated watchlist report. Returns the file path."""
+    report_dir = Path(VAULT_PATH) / REPORT_DIR
+    report_dir.mkdir(parents=True, exist_ok=True)
+    filepath = report_dir / f"watchlist-report-{report_date.isoformat()}.md"
+
+    lines = [
+        "---",
+        f'id: "watchlist-report-{report_date.isoformat()}"',
+        "type: watchlist-report",
+        f"date: {report_date.isoformat()}",
+        'tags: ["report", "ai"]',
+        "---",
+        "",
+        content,
+    ]
+    write_atomic(filepath, "\n".join(lines))
     return str(filepath)
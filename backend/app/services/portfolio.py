@@ -0,0 +1,159 @@
+"""Mark-to-market of open trades and the realized + unrealized equity curve.
+
+Prices for every ticker come from one ``get_history_many`` call, so a refresh
+costs at most one bulk download. Positions and the curve are computed over
+arrays rather than per trade. P/L is per share, like ``Trade.pnl``: trades
+carry no position size.
+"""
+
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from app.services import stock_data
+
+# Trade columns the router selects for compute()
+TRADE_FIELDS = (
+    "id",
+    "ticker",
+    "direction",
+    "entry_date",
+    "entry_price",
+    "target_price",
+    "stop_loss",
+    "exit_date",
+    "pnl",
+    "status",
+)
+
+
+def _closes(frames: dict[str, pd.DataFrame], today: pd.Timestamp) -> pd.DataFrame:
+    """Daily closes (dates x tickers) over the union of trading days through today, forward-filled."""
+    series = {}
+    for ticker, df in frames.items():
+        close = pd.Series(df["Close"].to_numpy(dtype=float), index=df.index.tz_localize(None).normalize())
+        series[ticker] = close[~close.index.duplicated(keep="last")]
+    closes = pd.DataFrame(series)
+    if closes.empty or closes.index[-1] < today:
+        closes = closes.reindex(closes.index.append(pd.DatetimeIndex([today])))
+    return closes.ffill()
+
+
+def _records(frame: pd.DataFrame) -> list[dict]:
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+def _positions(open_trades: pd.DataFrame, closes: pd.DataFrame, last_dates: dict, today: pd.Timestamp) -> pd.DataFrame:
+    sign = np.where(open_trades["direction"] == "long", 1.0, -1.0)
+    entry = open_trades["entry_price"].to_numpy(dtype=float)
+    last = closes.iloc[-1].reindex(open_trades["ticker"]).to_numpy(dtype=float)
+    stop = open_trades["stop_loss"].to_numpy(dtype=float)
+    target = open_trades["target_price"].to_numpy(dtype=float)
+
+    unrealized = sign * (last - entry)
+    exposure = sign * last
+    gross = np.nansum(np.abs(exposure))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        positions = pd.DataFrame({
+            "id": open_trades["id"],
+            "ticker": open_trades["ticker"],
+            "direction": open_trades["direction"],
+            "entry_date": open_trades["entry_date"],
+            "entry_price": entry,
+            "last_price": last,
+            "last_date": open_trades["ticker"].map(last_dates),
+            "unrealized_pnl": unrealized,
+            "unrealized_pct": unrealized / entry * 100,
+            "stop_loss": stop,
+            "target_price": target,
+            # Positive while the price is on the right side of the level
+            "stop_distance_pct": sign * (last - stop) / last * 100,
+            "target_distance_pct": sign * (target - last) / last * 100,
+            "exposure": exposure,
+            "weight_pct": np.abs(exposure) / gross * 100 if gross else np.nan,
+            "holding_days": (today - pd.to_datetime(open_trades["entry_date"])).dt.days,
+        })
+    return positions
+
+
+def _curve(trades: pd.DataFrame, closes: pd.DataFrame) -> pd.DataFrame:
+    """Realized P/L (cumulative by exit date) plus open trades marked at each day's close."""
+    dates = closes.index.to_numpy()
+    n = len(dates)
+    entry_idx = np.searchsorted(dates, pd.to_datetime(trades["entry_date"]).to_numpy())
+    # A closed trade is realized from its exit day on; open trades stay marked to the end
+    closed = trades["status"].to_numpy() == "closed"
+    exit_idx = np.where(closed, np.searchsorted(dates, pd.to_datetime(trades["exit_date"]).to_numpy()), n)
+
+    pnl = trades["pnl"].fillna(0.0).to_numpy(dtype=float)
+    realized = np.bincount(exit_idx[closed], weights=pnl[closed], minlength=n + 1)[:n].cumsum()
+
+    held = (exit_idx > 0) & trades["ticker"].isin(closes.columns).to_numpy()
+    prices = closes.reindex(columns=trades["ticker"][held]).to_numpy(dtype=float)
+    sign = np.where(trades["direction"][held] == "long", 1.0, -1.0)
+    days = np.arange(n)[:, None]
+    active = (days >= entry_idx[held]) & (days < exit_idx[held])
+    marked = np.where(active, sign * (prices - trades["entry_price"][held].to_numpy(dtype=float)), 0.0)
+    unrealized = np.nan_to_num(marked).sum(axis=1)
+
+    return pd.DataFrame({
+        "date": closes.index.date,
+        "realized": realized.round(2),
+        "unrealized": unrealized.round(2),
+        "equity": (realized + unrealized).round(2),
+    })
+
+
+def compute(rows: list[dict], period: str = "1y") -> dict:
+    """Open positions marked at their latest close and the daily equity curve over ``period``.
+
+    Raises ValueError for a period that does not map to a date range.
+    """
+    start_ts = stock_data.period_start(period)
+    if start_ts is None:
+        raise ValueError(f"Unsupported period: {period}")
+
+    timings: dict[str, float] = {}
+    start = time.perf_counter()
+    today = pd.Timestamp(date.today())
+    window_start = pd.Timestamp(start_ts, unit="s").normalize()
+
+    trades = pd.DataFrame.from_records(rows, columns=TRADE_FIELDS)
+    # Cancelled or otherwise inactive trades carry no P/L
+    trades = trades[trades["status"].isin(("open", "closed"))].reset_index(drop=True)
+    is_open = trades["status"] == "open"
+    in_window = is_open | (pd.to_datetime(trades["exit_date"]) >= window_start)
+    tickers = list(dict.fromkeys(trades.loc[in_window, "ticker"]))
+
+    frames = stock_data.get_history_many(tickers, period=period)
+    timings["load"] = time.perf_counter() - start
+
+    t = time.perf_counter()
+    closes = _closes(frames, today)
+    last_dates = {ticker: df.index[-1].date() for ticker, df in frames.items()}
+    positions = _positions(trades[is_open], closes, last_dates, today)
+    curve = _curve(trades, closes)
+    timings["compute"] = time.perf_counter() - t
+    timings["total"] = time.perf_counter() - start
+
+    exposure = positions["exposure"]
+    equity = curve["equity"]
+    realized = float(trades.loc[trades["status"] == "closed", "pnl"].sum())
+    unrealized = float(positions["unrealized_pnl"].sum())
+    return {
+        "positions": _records(positions.round(2)),
+        "open_positions": len(positions),
+        "unrealized_pnl": round(unrealized, 2),
+        "realized_pnl": round(realized, 2),
+        "total_pnl": round(realized + unrealized, 2),
+        "long_exposure": round(float(exposure[exposure > 0].sum()), 2),
+        "short_exposure": round(float(exposure[exposure < 0].abs().sum()), 2),
+        "gross_exposure": round(float(exposure.abs().sum()), 2),
+        "net_exposure": round(float(exposure.sum()), 2),
+        "max_drawdown": round(float((equity - equity.cummax()).min()), 2) if len(equity) else 0.0,
+        "curve": _records(curve),
+        "missing": [t for t in tickers if t not in frames],
+        "timings": {k: round(v, 4) for k, v in timings.items()},
+    }
@@ -0,0 +1,145 @@
+"""Thread-safe token-bucket rate limiter with priority lanes."""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+INTERACTIVE = 0
+BACKGROUND = 1
+LANES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Priority of the current request; copied into worker threads by asyncio.to_thread
+_priority: ContextVar[int] = ContextVar("rate_limit_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """Run the enclosed upstream calls in the background lane."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def parse_budgets(spec: str) -> dict[str, tuple[float, int]]:
+    """Parse "info=0.5/2,history=1/3" into {endpoint: (rate_per_sec, burst)}."""
+    budgets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, limit = item.partition("=")
+        rate, _, burst = limit.partition("/")
+        budgets[name.strip()] = (float(rate), int(burst or 1))
+    return budgets
+
+
+class TokenBucket:
+    """Classic token bucket. Not thread-safe on its own; RateLimiter holds the lock."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available (after the last refill)."""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class RateLimiter:
+    """Global bucket plus per-endpoint buckets, served in (priority, arrival) order.
+
+    A caller proceeds when both the global bucket and its endpoint's bucket hold
+    a token and no waiter ahead of it (higher priority, or same priority and
+    earlier) is eligible for its own endpoint.
+    """
+
+    def __init__(self, rate: float, burst: int, budgets: dict[str, tuple[float, int]] | None = None):
+        self._global = TokenBucket(rate, burst)
+        self._buckets = {name: TokenBucket(r, b) for name, (r, b) in (budgets or {}).items()}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiters: list[tuple[int, int, str]] = []
+        self._stats = {lane: {"acquired": 0, "wait_total": 0.0, "wait_max": 0.0} for lane in LANES}
+
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        if endpoint not in self._buckets:
+            # Unknown endpoints are effectively bound by the global budget only
+            self._buckets[endpoint] = TokenBucket(self._global.rate, self._global.burst)
+        return self._buckets[endpoint]
+
+    def _is_next(self, entry: tuple[int, int, str]) -> bool:
+        eligible = [w for w in self._waiters if self._bucket(w[2]).tokens >= 1]
+        return bool(eligible) and min(eligible) == entry
+
+    def acquire(self, endpoint: str, priority: int | None = None) -> float:
+        """Block until a call to ``endpoint`` may proceed. Returns seconds waited."""
+        if priority is None:
+            priority = _priority.get()
+        entry = (priority, next(self._seq), endpoint)
+        start = time.monotonic()
+
+        with self._cond:
+            bucket = self._bucket(endpoint)
+            self._waiters.append(entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._global.refill(now)
+                    for b in self._buckets.values():
+                        b.refill(now)
+                    if self._global.tokens >= 1 and self._is_next(entry):
+                        self._global.tokens -= 1
+                        bucket.tokens -= 1
+                        break
+                    timeout = max(self._global.wait_time(), bucket.wait_time())
+                    self._cond.wait(min(max(timeout, 0.01), 1.0))
+            finally:
+                self._waiters.remove(entry)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            stats = self._stats[priority]
+            stats["acquired"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+        return waited
+
+    def stats(self) -> dict:
+        """Queue depth, wait times and remaining tokens, for monitoring."""
+        with self._cond:
+            now = time.monotonic()
+            self._global.refill(now)
+            lanes = {}
+            for priority, name in LANES.items():
+                s = self._stats[priority]
+                lanes[name] = {
+                    "queue_depth": sum(1 for w in self._waiters if w[0] == priority),
+                    "acquired": s["acquired"],
+                    "wait_avg": round(s["wait_total"] / s["acquired"], 3) if s["acquired"] else 0.0,
+                    "wait_max": round(s["wait_max"], 3),
+                }
+            endpoints = {}
+            for name, b in self._buckets.items():
+                b.refill(now)
+                endpoints[name] = {
+                    "rate": b.rate,
+                    "burst": b.burst,
+                    "tokens": round(b.tokens, 2),
+                    "queue_depth": sum(1 for w in self._waiters if w[2] == name),
+                }
+            return {
+                "rate": self._global.rate,
+                "burst": self._global.burst,
+                "tokens": round(self._global.tokens, 2),
+                "lanes": lanes,
+                "endpoints": endpoints,
+            }
@@ -0,0 +1,159 @@
+"""Batch AI report over the watchlist.
+
+A job loads indicators for every ticker in bulk, then fans the LLM requests
+out under REPORT_CONCURRENCY and assembles one Markdown report. Jobs run as
+asyncio tasks in this process; their state is polled via ``get_job``.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+
+from app.db.database import SessionLocal
+from app.db.models import Watchlist
+from app.services import llm, obsidian, rate_limiter, stock_data
+
+REPORT_CONCURRENCY = int(os.getenv("REPORT_CONCURRENCY", "4"))  # parallel LLM calls per job
+REPORT_PERIOD = "6mo"
+MAX_JOBS = 20  # finished jobs kept for polling
+
+DEFAULT_PROMPT = (
+    "この銘柄の現在のテクニカル状況を3〜5行で要約し、スイングトレードの観点から"
+    "注目点（エントリー候補・警戒点）とリスク要因を挙げてください。"
+)
+
+_jobs: OrderedDict[str, dict] = OrderedDict()
+_tasks: set[asyncio.Task] = set()
+
+
+def _watchlist_tickers() -> list[str]:
+    with SessionLocal() as db:
+        return [t for (t,) in db.query(Watchlist.ticker).filter(Watchlist.status == "active")]
+
+
+def _load_indicators(tickers: list[str]) -> dict[str, dict]:
+    with rate_limiter.background_priority():
+        frames = stock_data.get_history_many(tickers, period=REPORT_PERIOD)
+        return {t: stock_data.get_indicators(t, period=REPORT_PERIOD) for t in tickers if t in frames}
+
+
+def _render(job: dict) -> str:
+    lines = [f"# ウォッチリスト AI レポート ({job['report_date']})", ""]
+    done = [i for i in job["items"].values() if i["status"] == "done"]
+    failed = [i for i in job["items"].values() if i["status"] == "error"]
+    lines.append(f"- 対象: {job['total']} 銘柄 / 成功: {len(done)} / 失敗: {len(failed)}")
+    lines.append("")
+    for item in done:
+        lines.extend([f"## {item['ticker']}", "", item["response"], ""])
+    if failed:
+        lines.append("## 取得失敗")
+        lines.extend(f"- {item['ticker']}: {item['error']}" for item in failed)
+        lines.append("")
+    return "\n".join(lines)
+
+
+async def _analyze(job: dict, ticker: str, indicators: dict | None, semaphore: asyncio.Semaphore):
+    item = job["items"][ticker]
+    if not indicators:
+        item.update(status="error", error="no price data")
+        job["failed"] += 1
+        return
+
+    async with semaphore:
+        item["status"] = "running"
+        start = time.perf_counter()
+        try:
+            context = llm.build_context(ticker=ticker, indicators=indicators)
+            item["response"] = await llm.complete(job["prompt"], context=context)
+            if job["obsidian"]:
+                item["note_path"] = await asyncio.to_thread(
+                    obsidian.write_ticker_analysis, ticker, job["report_date"], item["response"], indicators
+                )
+        except Exception as e:
+            item.update(status="error", error=str(e))
+            job["failed"] += 1
+        else:
+            item["status"] = "done"
+            job["completed"] += 1
+        finally:
+            item["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _run(job: dict):
+    start = time.perf_counter()
+    job["status"] = "running"
+    try:
+        tickers = job["tickers"] or await asyncio.to_thread(_watchlist_tickers)
+        job["tickers"] = tickers
+        job["total"] = len(tickers)
+        job["items"] = {t: {"ticker": t, "status": "pending"} for t in tickers}
+
+        t = time.perf_counter()
+        indicators = await asyncio.to_thread(_load_indicators, tickers)
+        job["timings"]["indicators"] = round(time.perf_counter() - t, 3)
+
+        t = time.perf_counter()
+        semaphore = asyncio.Semaphore(REPORT_CONCURRENCY)
+        await asyncio.gather(*(_analyze(job, ticker, indicators.get(ticker), semaphore) for ticker in tickers))
+        job["timings"]["llm"] = round(time.perf_counter() - t, 3)
+
+        job["report"] = _render(job)
+        if job["obsidian"]:
+            job["report_path"] = await asyncio.to_thread(
+                obsidian.write_watchlist_report, job["report_date"], job["report"]
+            )
+        job["status"] = "done"
+    except Exception as e:
+        job.update(status="error", error=str(e))
+    finally:
+        job["timings"]["total"] = round(time.perf_counter() - start, 3)
+        job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+
+
+def start_job(tickers: list[str] | None = None, prompt: str | None = None, write_obsidian: bool = False) -> dict:
+    """Start a report job in the background and return its initial state.
+
+    Raises ValueError if the LLM provider is not usable.
+    """
+    llm.check_provider()
+    job_id = str(uuid.uuid4())
+    job = {
+        "job_id": job_id,
+        "status": "pending",
+        "report_date": date.today(),
+        "prompt": prompt or DEFAULT_PROMPT,
+        "obsidian": write_obsidian,
+        "tickers": list(dict.fromkeys(tickers)) if tickers else [],
+        "total": len(tickers or []),
+        "completed": 0,
+        "failed": 0,
+        "items": {},
+        "timings": {},
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "finished_at": None,
+        "report": None,
+        "report_path": None,
+        "error": None,
+    }
+    _jobs[job_id] = job
+    while len(_jobs) > MAX_JOBS:
+        oldest = next(iter(_jobs))
+        if _jobs[oldest]["status"] in ("pending", "running"):
+            break
+        del _jobs[oldest]
+
+    task = asyncio.create_task(_run(job))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return get_job(job_id)
+
+
+def get_job(job_id: str) -> dict | None:
+    """Job state with items as a list, or None for an unknown id."""
+    job = _jobs.get(job_id)
+    if job is None:
+        return None
+    return {**job, "items": list(job["items"].values())}
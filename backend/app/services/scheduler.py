@@ -0,0 +1,148 @@
+"""Background cache pre-warming for watchlist and open-trade tickers.
+
+Runs on the event loop started from the FastAPI lifespan: once at startup
+(from the bar store, refetching only stale series), every weekday after the
+JPX close, and optionally on a fixed cadence. Upstream calls go through the
+background lane of the rate limiter so interactive requests stay ahead.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.db.database import SessionLocal
+from app.db.models import Trade, Watchlist
+from app.services import rate_limiter, stock_data
+
+logger = logging.getLogger(__name__)
+
+JST = ZoneInfo("Asia/Tokyo")
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+PREWARM_AT = os.getenv("PREWARM_AT", "15:45")  # JST; JPX closes at 15:30
+PREWARM_INTERVAL_MINUTES = int(os.getenv("PREWARM_INTERVAL_MINUTES", "0"))  # 0 = daily run only
+PREWARM_PERIOD = "6mo"
+
+_task: asyncio.Task | None = None
+_manual: asyncio.Task | None = None
+_run_lock = asyncio.Lock()  # one run at a time: scheduled runs wait for a manual one and vice versa
+_status: dict = {
+    "enabled": PREWARM_ENABLED,
+    "running": False,
+    "runs": 0,
+    "last_run": None,
+    "last_duration": None,
+    "last_error": None,
+    "tickers": 0,
+    "failures": {},
+    "next_run": None,
+}
+
+
+def _tickers() -> list[str]:
+    with SessionLocal() as db:
+        watched = [t for (t,) in db.query(Watchlist.ticker).filter(Watchlist.status == "active")]
+        held = [t for (t,) in db.query(Trade.ticker).filter(Trade.status == "open").distinct()]
+    return list(dict.fromkeys(watched + held))
+
+
+def run_once(refresh: bool = True) -> dict:
+    """Warm bars, ticker info and indicator snapshots for every tracked ticker.
+
+    With ``refresh`` the in-memory cache is bypassed and stored series re-fetch
+    their tail, so the day's final bar replaces the intraday one.
+    Returns {"tickers": n, "failures": {ticker: error}}.
+    """
+    failures: dict[str, str] = {}
+    with rate_limiter.background_priority():
+        tickers = _tickers()
+        frames = stock_data.get_history_many(tickers, period=PREWARM_PERIOD, refresh=refresh)
+        for ticker in tickers:
+            if ticker not in frames:
+                failures[ticker] = "no price data"
+            try:
+                stock_data.get_ticker_info(ticker, refresh=refresh)
+                if ticker in frames:
+                    stock_data.get_indicators(ticker, period=PREWARM_PERIOD)
+            except Exception as e:
+                failures[ticker] = str(e)
+    return {"tickers": len(tickers), "failures": failures}
+
+
+async def _run(refresh: bool):
+    async with _run_lock:
+        _status["running"] = True
+        start = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(run_once, refresh)
+        except Exception as e:
+            logger.exception("Cache pre-warm failed")
+            _status["last_error"] = str(e)
+        else:
+            _status.update(last_error=None, tickers=result["tickers"], failures=result["failures"])
+        finally:
+            _status["running"] = False
+            _status["runs"] += 1
+            _status["last_run"] = datetime.now(JST).isoformat(timespec="seconds")
+            _status["last_duration"] = round(time.perf_counter() - start, 2)
+
+
+def _next_run(now: datetime, last_run: datetime | None) -> datetime:
+    hour, minute = map(int, PREWARM_AT.split(":"))
+    daily = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if daily <= now:
+        daily += timedelta(days=1)
+    while daily.weekday() >= 5:
+        daily += timedelta(days=1)
+
+    if PREWARM_INTERVAL_MINUTES > 0:
+        cadence = (last_run or now) + timedelta(minutes=PREWARM_INTERVAL_MINUTES)
+        return min(daily, max(cadence, now))
+    return daily
+
+
+async def _loop():
+    await _run(refresh=False)
+    last_run = datetime.now(JST)
+    while True:
+        now = datetime.now(JST)
+        next_run = _next_run(now, last_run)
+        _status["next_run"] = next_run.isoformat(timespec="seconds")
+        await asyncio.sleep((next_run - now).total_seconds())
+        await _run(refresh=True)
+        last_run = datetime.now(JST)
+
+
+def start():
+    """Start the scheduler task (no-op when PREWARM_ENABLED=0)."""
+    global _task
+    if PREWARM_ENABLED and _task is None:
+        _task = asyncio.create_task(_loop())
+
+
+async def stop():
+    global _task, _manual
+    for task in (_task, _manual):
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    _task = None
+    _manual = None
+
+
+def trigger() -> bool:
+    """Start a refreshing run now unless one is in progress. Returns whether it started."""
+    global _manual
+    if _run_lock.locked() or (_manual is not None and not _manual.done()):
+        return False
+    _manual = asyncio.create_task(_run(refresh=True))
+    return True
+
+
+def status() -> dict:
+    return dict(_status)
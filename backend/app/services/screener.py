@@ -0,0 +1,87 @@
+"""Watchlist screener: bulk bars, parallel indicators, vectorized filters."""
+
+import os
+import time
+
+import pandas as pd
+
+from app.services import batch, stock_data, technical
+
+SCREEN_WORKERS = int(os.getenv("SCREEN_WORKERS", str(os.cpu_count() or 1)))
+DEFAULT_SORT = "volume_ratio"  # unusual volume first
+POOL_MIN_TICKERS = 32  # below this, process start-up and pickling cost more than they save
+
+_pool = batch.WorkerPool(SCREEN_WORKERS, POOL_MIN_TICKERS)
+
+
+def parse_filter(expr: str) -> tuple[str, str, float]:
+    """Parse "rsi_14<30" into (field, op, value). Raises ValueError on bad input."""
+    return batch.parse_condition(expr, technical.SERIES_COLUMNS)
+
+
+def _indicators_chunk(frames: list[tuple[str, pd.DataFrame]]) -> list[tuple[str, dict]]:
+    return [(ticker, technical.calculate_indicators(df)) for ticker, df in frames]
+
+
+def _compute_indicators(frames: dict[str, pd.DataFrame]) -> dict[str, dict]:
+    items = [(ticker, df[["Close", "Volume"]]) for ticker, df in frames.items()]
+    return dict(_pool.run(_indicators_chunk, items))
+
+
+def screen(
+    tickers: list[str],
+    filters: list[str],
+    sort_by: str | None = DEFAULT_SORT,
+    descending: bool = True,
+    limit: int | None = None,
+    period: str = "6mo",
+) -> dict:
+    """Screen tickers by indicator filters and return ranked rows with per-stage timing."""
+    parsed = [parse_filter(f) for f in filters]
+    if sort_by is not None and sort_by not in technical.SERIES_COLUMNS:
+        raise ValueError(f"Unknown indicator field: {sort_by}")
+
+    timings: dict[str, float] = {}
+    start = time.perf_counter()
+
+    frames = stock_data.get_history_many(tickers, period=period)
+    timings["load"] = time.perf_counter() - start
+
+    t = time.perf_counter()
+    indicators: dict[str, dict] = {}
+    misses: dict[str, pd.DataFrame] = {}
+    for ticker, df in frames.items():
+        cached = stock_data.cached_indicators(ticker, period, "1d", df)
+        if cached is None:
+            misses[ticker] = df
+        else:
+            indicators[ticker] = cached
+    for ticker, values in _compute_indicators(misses).items():
+        stock_data.cache_indicators(ticker, period, "1d", misses[ticker], values)
+        indicators[ticker] = values
+    timings["indicators"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    table = pd.DataFrame.from_dict({k: v for k, v in indicators.items() if v}, orient="index")
+    table = table.reindex(columns=["date", *technical.SERIES_COLUMNS])
+    mask = batch.mask(table, parsed)
+    matched = table[mask]
+    if sort_by is not None:
+        matched = matched.sort_values(sort_by, ascending=not descending, na_position="last")
+    if limit is not None:
+        matched = matched.head(limit)
+    timings["filter"] = time.perf_counter() - t
+    timings["total"] = time.perf_counter() - start
+
+    rows = []
+    for rank, (ticker, row) in enumerate(matched.iterrows(), start=1):
+        values = {k: v for k, v in row.items() if pd.notna(v)}
+        rows.append({"rank": rank, "ticker": ticker, **values})
+
+    return {
+        "rows": rows,
+        "screened": len(tickers),
+        "matched": int(mask.sum()),
+        "missing": [t for t in dict.fromkeys(tickers) if not indicators.get(t)],
+        "timings": {k: round(v, 4) for k, v in timings.items()},
+    }
@@ -0,0 +1,93 @@
+"""Columnar OHLCV + indicator series for charting."""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.services import stock_data, technical
+
+OHLCV_MAP = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}
+_AGG = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+FETCH_PERIODS = ["1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "max"]
+WARMUP_DAYS = 100  # calendar days fetched before `start` so its first rows have sma_50 etc.
+
+
+def fetch_period(period: str, interval: str, start: date | None) -> str:
+    """``period``, widened to the shortest standard period that reaches ``start`` plus warm-up.
+
+    Intraday history is only available for short periods upstream, so for
+    intraday intervals a ``start`` before ``period`` raises ValueError instead.
+    Periods that do not map to a date range are returned unchanged.
+    """
+    current = stock_data.period_start(period)
+    if start is None or current is None:
+        return period
+    if interval[-1] not in "dko":
+        if pd.Timestamp(start, tz="UTC").timestamp() < current:
+            raise ValueError(f"start {start} is before the {period} period available for {interval} bars")
+        return period
+    needed = pd.Timestamp(start - timedelta(days=WARMUP_DAYS), tz="UTC").timestamp()
+    if current <= needed:
+        return period
+    return next(p for p in FETCH_PERIODS if stock_data.period_start(p) <= needed)
+
+
+def build_series(
+    df: pd.DataFrame,
+    start: date | None = None,
+    end: date | None = None,
+    max_points: int | None = None,
+) -> tuple[pd.DataFrame, int]:
+    """OHLCV plus indicator columns for [start, end], downsampled to at most ``max_points`` rows.
+
+    Indicators are computed over the whole frame before slicing, so the first
+    rows of the range are not affected by warm-up. Downsampling groups
+    consecutive bars into equal buckets (first open, max high, min low, last
+    close, summed volume, last indicator values) so candles stay truthful.
+    Returns (frame, number of bars in range before downsampling).
+    """
+    frame = df[list(OHLCV_MAP)].rename(columns=OHLCV_MAP)
+    frame = frame.join(technical.calculate_series(df))
+
+    if start is not None:
+        frame = frame[frame.index >= pd.Timestamp(start, tz=frame.index.tz)]
+    if end is not None:
+        frame = frame[frame.index < pd.Timestamp(end + timedelta(days=1), tz=frame.index.tz)]
+
+    if max_points is None or len(frame) <= max_points:
+        return frame, len(frame)
+
+    buckets = np.arange(len(frame)) * max_points // len(frame)
+    agg = {col: _AGG.get(col, "last") for col in frame.columns}
+    sampled = frame.groupby(buckets).agg(agg)
+    # Label each bucket with its last bar, like the close it carries
+    last = np.flatnonzero(np.diff(buckets, append=buckets[-1] + 1))
+    sampled.index = frame.index[last]
+    return sampled, len(frame)
+
+
+def to_columns(frame: pd.DataFrame) -> dict[str, list]:
+    """Column name -> list of values, with NaN as None for JSON."""
+    columns = {}
+    for col in frame.columns:
+        values = frame[col].to_numpy(dtype=float)
+        out = np.round(values, 4).astype(object)
+        out[np.isnan(values)] = None
+        columns[col] = out.tolist()
+    return columns
+
+
+def to_arrow_ipc(frame: pd.DataFrame) -> bytes:
+    """Serialize as an Arrow IPC stream. Requires the optional ``pyarrow`` dependency."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError("Arrow output requires pyarrow (pip install 'stock-dashboard-backend[arrow]')")
+
+    table = pa.Table.from_pandas(frame.reset_index(names="date"), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -1,72 +1,438 @@
-"""yfinance wrapper with caching."""
+"""yfinance wrapper with in-memory caching backed by the on-disk bar store."""
 
+import asyncio
+import os
+import re
+import threading
 import time
+from concurrent.futures import Future
+from dataclasses import astuple
 from datetime import datetime, timedelta
 
+import numpy as np
+import pandas as pd
 import yfinance as yf
 
-# Simple in-memory cache: {key: (data, expiry_time)}
-_cache: dict[str, tuple[object, float]] = {}
+from app.services import bar_store, cache, rate_limiter, technical
+
 CACHE_TTL = 60 * 60 * 4  # 4 hours for daily data
-_last_call = 0.0
-API_DELAY = 1.0  # seconds between API calls
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTLS = cache.parse_ttls(os.getenv("CACHE_TTLS", ""))  # per-namespace overrides, e.g. "info=86400"
+
+_cache = cache.Cache(CACHE_MAX_BYTES, CACHE_TTL, CACHE_TTLS)
+API_RATE = float(os.getenv("YF_RATE_LIMIT", "1.0"))  # upstream calls per second
+API_BURST = int(os.getenv("YF_BURST", "3"))
+ENDPOINT_BUDGETS = rate_limiter.parse_budgets(os.getenv("YF_ENDPOINT_LIMITS", "info=0.5/2,history=1/3,search=0.5/1"))
+
+_limiter = rate_limiter.RateLimiter(API_RATE, API_BURST, ENDPOINT_BUDGETS)
+
+ACTION_COLUMNS = ["Dividends", "Stock Splits"]
+
+
+def _rate_limit(endpoint: str):
+    _limiter.acquire(endpoint)
+
+
+def limiter_stats() -> dict:
+    """Upstream rate limiter counters (queue depth, wait times, tokens)."""
+    return _limiter.stats()
+
+
+def _get_cached(key: str, record: bool = True):
+    return _cache.get(key, record)
+
+
+def _set_cached(key: str, data: object, ttl: float | None = None):
+    _cache.set(key, data, ttl)
+
+
+def cache_stats() -> dict:
+    """In-memory cache size, hit/miss/eviction counters per namespace."""
+    return _cache.stats()
 
 
-def _rate_limit():
-    global _last_call
-    elapsed = time.time() - _last_call
-    if elapsed < API_DELAY:
-        time.sleep(API_DELAY - elapsed)
-    _last_call = time.time()
+# In-flight fetches shared between threads: {cache_key: Future}
+_inflight: dict[str, Future] = {}
+_inflight_lock = threading.Lock()
 
+# In-flight fetches shared between coroutines on the event loop: {cache_key: Task}
+_async_inflight: dict[str, asyncio.Task] = {}
 
-def _get_cached(key: str):
-    if key in _cache:
-        data, expiry = _cache[key]
-        if time.time() < expiry:
-            return data
-        del _cache[key]
-    return None
 
+def _single_flight(key: str, fn, *args):
+    """Run fn(*args) once per key; concurrent callers with the same key share the result."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
 
-def _set_cached(key: str, data: object, ttl: int = CACHE_TTL):
-    _cache[key] = (data, time.time() + ttl)
+    if not leader:
+        return future.result()
 
+    try:
+        result = fn(*args)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
 
-def get_ticker_info(ticker: str) -> dict:
-    """Get basic ticker info (name, sector, market cap, etc.)."""
+
+async def _run_off_loop(key: str, fn, *args):
+    """Run a blocking fetch in a worker thread, coalescing identical concurrent awaits."""
+    task = _async_inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+        _async_inflight[key] = task
+        task.add_done_callback(lambda t: _async_inflight.pop(key, None) if _async_inflight.get(key) is t else None)
+    # Shield so a disconnecting client does not cancel the fetch other waiters share
+    return await asyncio.shield(task)
+
+
+def _load_ticker_info(ticker: str, refresh: bool = False) -> dict:
     cache_key = f"info:{ticker}"
-    cached = _get_cached(cache_key)
+    cached = _get_cached(cache_key, record=False) if not refresh else None
     if cached:
         return cached
 
-    _rate_limit()
+    _rate_limit("info")
     t = yf.Ticker(ticker)
     info = t.info or {}
     _set_cached(cache_key, info)
     return info
 
 
-def get_history(ticker: str, period: str = "6mo", interval: str = "1d"):
-    """Get price history as a pandas DataFrame."""
-    cache_key = f"history:{ticker}:{period}:{interval}"
+def get_ticker_info(ticker: str, refresh: bool = False) -> dict:
+    """Get basic ticker info (name, sector, market cap, etc.).
+
+    ``refresh`` bypasses the cache and re-downloads.
+    """
+    cache_key = f"info:{ticker}"
+    cached = _get_cached(cache_key) if not refresh else None
+    if cached:
+        return cached
+    return _single_flight(cache_key, _load_ticker_info, ticker, refresh)
+
+
+async def aget_ticker_info(ticker: str) -> dict:
+    """Async variant of get_ticker_info that never blocks the event loop."""
+    cache_key = f"info:{ticker}"
     cached = _get_cached(cache_key)
+    if cached:
+        return cached
+    return await _run_off_loop(cache_key, _single_flight, cache_key, _load_ticker_info, ticker)
+
+
+def period_start(period: str) -> int | None:
+    """Epoch seconds at which a yfinance ``period`` begins, or None if unknown."""
+    now = pd.Timestamp.now(tz="UTC").normalize()
+    if period == "max":
+        return 0
+    if period == "ytd":
+        return int(now.replace(month=1, day=1).timestamp())
+    m = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not m:
+        return None
+    n, unit = int(m.group(1)), m.group(2)
+    offset = {
+        "d": pd.DateOffset(days=n),
+        "wk": pd.DateOffset(weeks=n),
+        "mo": pd.DateOffset(months=n),
+        "y": pd.DateOffset(years=n),
+    }[unit]
+    return int((now - offset).timestamp())
+
+
+def _needs_download(stored: bar_store.SeriesInfo | None, start_ts: int | None) -> bool:
+    return start_ts is None or stored is None or stored.start_ts > start_ts
+
+
+def _is_stale(stored: bar_store.SeriesInfo) -> bool:
+    return time.time() - stored.updated_at >= CACHE_TTL
+
+
+def _tail_start(stored: bar_store.SeriesInfo) -> str:
+    # Re-fetch a week before the last stored bar: that bar may have been partial (intraday),
+    # and the complete bars before it show whether earlier prices were re-adjusted
+    last = pd.Timestamp(stored.last_ts, unit="s", tz="UTC").tz_convert(stored.tz) - pd.Timedelta(days=7)
+    return last.strftime("%Y-%m-%d")
+
+
+def _full_range(start_ts: int) -> dict:
+    """yfinance download arguments covering everything a stored series starts from."""
+    if start_ts <= 0:
+        return {"period": "max"}
+    return {"start": pd.Timestamp(start_ts, unit="s", tz="UTC").strftime("%Y-%m-%d")}
+
+
+def _epoch(index: pd.DatetimeIndex, tz: str) -> np.ndarray:
+    index = index if index.tz is not None else index.tz_localize(tz)
+    return index.tz_convert("UTC").as_unit("s").asi8
+
+
+def _readjusted(ticker: str, interval: str, stored: bar_store.SeriesInfo, tail: pd.DataFrame) -> bool:
+    """True if ``tail`` shows the stored bars were adjusted for a dividend or split they predate.
+
+    auto_adjust rescales every bar before an ex-date, so a new dividend or split,
+    or a complete overlap bar whose close no longer matches the store, means the
+    stored series has to be replaced rather than extended.
+    """
+    if tail.empty:
+        return False
+    ts = _epoch(tail.index, stored.tz)
+    actions = tail.reindex(columns=ACTION_COLUMNS).fillna(0).to_numpy()
+    if (actions[ts > stored.last_ts] != 0).any():
+        return True
+
+    overlap = ts < stored.last_ts
+    if not overlap.any():
+        return False
+    saved = bar_store.load(ticker, interval, int(ts[overlap][0]))
+    expected = pd.Series(saved["Close"].to_numpy(dtype=float), index=_epoch(saved.index, stored.tz))
+    expected = expected.reindex(ts[overlap]).to_numpy()
+    fetched = tail["Close"].to_numpy(dtype=float)[overlap]
+    present = ~np.isnan(expected) & ~np.isnan(fetched)
+    return not np.allclose(fetched[present], expected[present], rtol=1e-5)
+
+
+def _save_bars(ticker: str, interval: str, df: pd.DataFrame, start_ts: int | None = None, replace: bool = False):
+    """Write downloaded bars to the store and drop cached frames, indicator snapshots and answers they supersede."""
+    bar_store.save(ticker, interval, df, start_ts=start_ts, replace=replace)
+    if not df.empty:
+        # Frames for other periods would keep serving the replaced (intraday) bar
+        _cache.invalidate_prefix(f"history:{ticker}:")
+        _cache.invalidate_prefix(f"indicators:{ticker}:{interval}:")
+        _cache.invalidate_prefix(f"answer:{ticker}:")
+
+
+def _fetch_history(ticker: str, period: str, interval: str) -> pd.DataFrame:
+    """Serve history from the bar store, downloading only what it is missing."""
+    start_ts = period_start(period)
+    stored = bar_store.series_info(ticker, interval)
+
+    if start_ts is None:
+        # Period we cannot map to a date range: bypass the store entirely
+        _rate_limit("history")
+        df = yf.Ticker(ticker).history(period=period, interval=interval)
+        return df[bar_store.OHLCV_COLUMNS] if not df.empty else df
+
+    if _needs_download(stored, start_ts):
+        _rate_limit("history")
+        df = yf.Ticker(ticker).history(period=period, interval=interval)
+        _save_bars(ticker, interval, df, start_ts=start_ts)
+    elif _is_stale(stored):
+        _rate_limit("history")
+        tail = yf.Ticker(ticker).history(start=_tail_start(stored), interval=interval)
+        if _readjusted(ticker, interval, stored, tail):
+            _rate_limit("history")
+            df = yf.Ticker(ticker).history(interval=interval, **_full_range(stored.start_ts))
+            _save_bars(ticker, interval, df, start_ts=stored.start_ts, replace=True)
+        else:
+            _save_bars(ticker, interval, tail)
+
+    return bar_store.load(ticker, interval, start_ts)
+
+
+def _download_many(tickers: list[str], actions: bool = False, **kwargs) -> dict[str, pd.DataFrame]:
+    """One yfinance multi-ticker download, split into per-ticker OHLCV frames.
+
+    ``actions`` keeps the Dividends and Stock Splits columns as well.
+    """
+    _rate_limit("history")
+    raw = yf.download(
+        tickers,
+        group_by="ticker",
+        auto_adjust=True,
+        actions=actions,
+        ignore_tz=False,
+        progress=False,
+        threads=True,
+        **kwargs,
+    )
+    columns = bar_store.OHLCV_COLUMNS + (ACTION_COLUMNS if actions else [])
+    frames: dict[str, pd.DataFrame] = {}
+    if raw is None or raw.empty:
+        return frames
+
+    for ticker in tickers:
+        if isinstance(raw.columns, pd.MultiIndex):
+            if ticker not in raw.columns.get_level_values(0):
+                continue
+            df = raw[ticker]
+        else:
+            df = raw
+        # The combined frame is reindexed to the union of all dates
+        df = df.reindex(columns=columns).dropna(how="all", subset=bar_store.OHLCV_COLUMNS)
+        if not df.empty:
+            frames[ticker] = df
+    return frames
+
+
+def _load_history(ticker: str, period: str, interval: str) -> pd.DataFrame:
+    cache_key = f"history:{ticker}:{period}:{interval}"
+    # Re-check: a previous leader may have filled the cache since our caller looked
+    cached = _get_cached(cache_key, record=False)
     if cached is not None:
         return cached
 
-    _rate_limit()
-    t = yf.Ticker(ticker)
-    df = t.history(period=period, interval=interval)
+    df = _fetch_history(ticker, period, interval)
     if not df.empty:
         _set_cached(cache_key, df)
     return df
 
 
-def get_quote(ticker: str) -> dict:
-    """Get current quote summary."""
-    info = get_ticker_info(ticker)
-    hist = get_history(ticker, period="5d")
+def get_history(ticker: str, period: str = "6mo", interval: str = "1d"):
+    """Get price history as a pandas DataFrame."""
+    cache_key = f"history:{ticker}:{period}:{interval}"
+    cached = _get_cached(cache_key)
+    if cached is not None:
+        return cached
+    return _single_flight(cache_key, _load_history, ticker, period, interval)
+
+
+async def aget_history(ticker: str, period: str = "6mo", interval: str = "1d"):
+    """Async variant of get_history that never blocks the event loop."""
+    cache_key = f"history:{ticker}:{period}:{interval}"
+    cached = _get_cached(cache_key)
+    if cached is not None:
+        return cached
+    return await _run_off_loop(cache_key, _single_flight, cache_key, _load_history, ticker, period, interval)
+
+
+def get_history_many(
+    tickers: list[str],
+    period: str = "6mo",
+    interval: str = "1d",
+    refresh: bool = False,
+) -> dict[str, pd.DataFrame]:
+    """Get price history for many tickers with a few bulk downloads.
+
+    Tickers whose bars are cached or fresh in the bar store are served locally;
+    the rest are split into full-period and tail-only downloads, plus one
+    re-download for tails that show a dividend or split since the last save. Tickers with no
+    data are omitted from the result. ``refresh`` ignores the in-memory cache
+    and store freshness, fetching the tail of every stored series.
+    """
+    start_ts = period_start(period)
+    result: dict[str, pd.DataFrame] = {}
+    full: list[str] = []
+    tail: dict[str, bar_store.SeriesInfo] = {}
+
+    for ticker in dict.fromkeys(tickers):
+        cached = _get_cached(f"history:{ticker}:{period}:{interval}") if not refresh else None
+        if cached is not None:
+            result[ticker] = cached
+            continue
+        stored = bar_store.series_info(ticker, interval) if start_ts is not None else None
+        if _needs_download(stored, start_ts):
+            full.append(ticker)
+        elif refresh or _is_stale(stored):
+            tail[ticker] = stored
+
+    if full:
+        frames = _download_many(full, period=period, interval=interval)
+        for ticker in full:
+            df = frames.get(ticker)
+            if df is None:
+                continue
+            if start_ts is None:
+                result[ticker] = df
+            else:
+                _save_bars(ticker, interval, df, start_ts=start_ts)
+
+    if tail:
+        start = min(_tail_start(stored) for stored in tail.values())
+        frames = _download_many(list(tail), actions=True, start=start, interval=interval)
+        readjusted = [ticker for ticker, df in frames.items() if _readjusted(ticker, interval, tail[ticker], df)]
+        for ticker, df in frames.items():
+            if ticker not in readjusted:
+                _save_bars(ticker, interval, df)
+        if readjusted:
+            replace_from = min(tail[ticker].start_ts for ticker in readjusted)
+            frames = _download_many(readjusted, interval=interval, **_full_range(replace_from))
+            for ticker, df in frames.items():
+                _save_bars(ticker, interval, df, start_ts=replace_from, replace=True)
+
+    for ticker in dict.fromkeys(tickers):
+        if ticker in result and ticker not in full:
+            continue
+        df = result[ticker] if ticker in result else bar_store.load(ticker, interval, start_ts)
+        if df.empty:
+            continue
+        result[ticker] = df
+        _set_cached(f"history:{ticker}:{period}:{interval}", df)
 
+    return result
+
+
+def _indicators_key(ticker: str, period: str, interval: str, df: pd.DataFrame, params) -> str:
+    params_key = ",".join(map(str, astuple(params or technical.DEFAULT_PARAMS)))
+    return f"indicators:{ticker}:{interval}:{period}:{int(df.index[-1].timestamp())}:{params_key}"
+
+
+def cached_indicators(ticker: str, period: str, interval: str, df: pd.DataFrame, params=None) -> dict | None:
+    """Memoized indicators for ``df`` (the frame get_history returned), or None on a miss."""
+    cached = _get_cached(_indicators_key(ticker, period, interval, df, params))
+    return dict(cached) if cached is not None else None
+
+
+def cache_indicators(ticker: str, period: str, interval: str, df: pd.DataFrame, values: dict, params=None):
+    """Memoize indicators computed elsewhere (e.g. in a worker process) for ``df``."""
+    _set_cached(_indicators_key(ticker, period, interval, df, params), values)
+
+
+def cached_answer(ticker: str | None, key: str) -> str | None:
+    """LLM answer memoized under ``key`` until ``ticker`` gets new bars, or None on a miss."""
+    return _get_cached(f"answer:{ticker or '-'}:{key}")
+
+
+def cache_answer(ticker: str | None, key: str, text: str):
+    _set_cached(f"answer:{ticker or '-'}:{key}", text)
+
+
+def _indicators_for(ticker: str, period: str, interval: str, df: pd.DataFrame, params) -> dict:
+    if df.empty:
+        return {}
+    cached = cached_indicators(ticker, period, interval, df, params)
+    if cached is None:
+        cached = technical.calculate_indicators(df, params)
+        cache_indicators(ticker, period, interval, df, cached, params)
+    return dict(cached)
+
+
+def get_indicators(
+    ticker: str,
+    period: str = "6mo",
+    interval: str = "1d",
+    params: technical.IndicatorParams | None = None,
+) -> dict:
+    """Latest technical indicators, memoized per ticker, interval, last bar and parameters."""
+    return _indicators_for(ticker, period, interval, get_history(ticker, period, interval), params)
+
+
+async def aget_indicators(
+    ticker: str,
+    period: str = "6mo",
+    interval: str = "1d",
+    params: technical.IndicatorParams | None = None,
+) -> dict:
+    """Async variant of get_indicators that never blocks the event loop."""
+    df = await aget_history(ticker, period, interval)
+    if df.empty:
+        return {}
+    cached = cached_indicators(ticker, period, interval, df, params)
+    if cached is not None:
+        return cached
+    key = _indicators_key(ticker, period, interval, df, params)
+    return dict(await _run_off_loop(key, _indicators_for, ticker, period, interval, df, params))
+
+
+def _quote_from_info(ticker: str, info: dict) -> dict:
     price = info.get("currentPrice") or info.get("regularMarketPrice", 0)
     prev_close = info.get("previousClose", price)
     change_pct = ((price - prev_close) / prev_close * 100) if prev_close else 0
@@ -81,8 +447,21 @@ def get_quote(ticker: str) -> dict:
     }
 
 
+def get_quote(ticker: str) -> dict:
+    """Get current quote summary."""
+    info = get_ticker_info(ticker)
+    get_history(ticker, period="5d")
+    return _quote_from_info(ticker, info)
+
+
+async def aget_quote(ticker: str) -> dict:
+    """Async variant of get_quote; info and recent history are fetched concurrently."""
+    info, _ = await asyncio.gather(aget_ticker_info(ticker), aget_history(ticker, period="5d"))
+    return _quote_from_info(ticker, info)
+
+
 def search_tickers(query: str, exchange: str = "JPX") -> list[dict]:
     """Search for tickers by name or code."""
-    _rate_limit()
+    _rate_limit("search")
     results = yf.search(query)
     return results.get("quotes", []) if isinstance(results, dict) else []
@@ -1,76 +1,183 @@
-"""Technical indicator calculations using pandas_ta."""
+"""Technical indicator calculations, vectorized over NumPy arrays.
 
-import pandas as pd
-import pandas_ta as ta
-
-
-def calculate_indicators(df: pd.DataFrame) -> dict:
-    """Calculate technical indicators from OHLCV DataFrame.
-
-    Returns a dict of the latest values for each indicator.
-    """
-    if df.empty or len(df) < 20:
-        return {}
+The formulas follow pandas_ta's defaults (SMA-seeded EMA for MACD, RMA for
+RSI, population std for Bollinger Bands) so values match what the dashboard
+showed when it was built on pandas_ta.
+"""
 
-    close = df["Close"]
-    volume = df["Volume"]
+from dataclasses import dataclass
 
-    # RSI
-    rsi = ta.rsi(close, length=14)
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
-    # MACD
-    macd_df = ta.macd(close, fast=12, slow=26, signal=9)
+MIN_BARS = 20
 
-    # Bollinger Bands
-    bb_df = ta.bbands(close, length=20, std=2)
+# Output columns, named after the TechnicalIndicators schema fields
+SERIES_COLUMNS = [
+    "rsi_14",
+    "macd",
+    "macd_signal",
+    "macd_hist",
+    "bb_upper",
+    "bb_middle",
+    "bb_lower",
+    "bb_position",
+    "sma_20",
+    "sma_50",
+    "volume_ratio",
+]
 
-    # SMA
-    sma_20 = ta.sma(close, length=20)
-    sma_50 = ta.sma(close, length=50) if len(df) >= 50 else None
+_EWM_CHUNK = 128  # keeps w**-k within float range for short spans
 
-    # Volume ratio (current vs 20-day average)
-    vol_sma_20 = ta.sma(volume, length=20)
 
-    latest = len(df) - 1
-    result = {
-        "date": df.index[latest].date().isoformat() if hasattr(df.index[latest], "date") else str(df.index[latest]),
-    }
+@dataclass(frozen=True)
+class IndicatorParams:
+    """Indicator lengths. Output keys keep the schema names regardless of values."""
 
-    if rsi is not None and not rsi.empty:
-        result["rsi_14"] = round(float(rsi.iloc[latest]), 2)
+    rsi_length: int = 14
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+    bb_length: int = 20
+    bb_std: float = 2.0
+    sma_short: int = 20
+    sma_long: int = 50
+    volume_length: int = 20
 
-    if macd_df is not None and not macd_df.empty:
-        macd_col = [c for c in macd_df.columns if c.startswith("MACD_")][0]
-        hist_col = [c for c in macd_df.columns if c.startswith("MACDh_")][0]
-        signal_col = [c for c in macd_df.columns if c.startswith("MACDs_")][0]
-        result["macd"] = round(float(macd_df[macd_col].iloc[latest]), 2)
-        result["macd_signal"] = round(float(macd_df[signal_col].iloc[latest]), 2)
-        result["macd_hist"] = round(float(macd_df[hist_col].iloc[latest]), 2)
 
-    if bb_df is not None and not bb_df.empty:
-        lower_col = [c for c in bb_df.columns if c.startswith("BBL_")][0]
-        mid_col = [c for c in bb_df.columns if c.startswith("BBM_")][0]
-        upper_col = [c for c in bb_df.columns if c.startswith("BBU_")][0]
-        bb_lower = float(bb_df[lower_col].iloc[latest])
-        bb_mid = float(bb_df[mid_col].iloc[latest])
-        bb_upper = float(bb_df[upper_col].iloc[latest])
-        current_price = float(close.iloc[latest])
-        bb_width = bb_upper - bb_lower
+DEFAULT_PARAMS = IndicatorParams()
 
-        result["bb_upper"] = round(bb_upper, 2)
-        result["bb_middle"] = round(bb_mid, 2)
-        result["bb_lower"] = round(bb_lower, 2)
-        result["bb_position"] = round((current_price - bb_lower) / bb_width, 3) if bb_width > 0 else 0.5
 
-    if sma_20 is not None and not sma_20.empty:
-        result["sma_20"] = round(float(sma_20.iloc[latest]), 2)
+def _ewm(x: np.ndarray, alpha: float, adjust: bool) -> np.ndarray:
+    """Exponentially weighted mean of a NaN-free array, as pandas ``ewm(alpha=...).mean()``.
 
-    if sma_50 is not None and not sma_50.empty:
-        result["sma_50"] = round(float(sma_50.iloc[latest]), 2)
+    Both modes are y_t = num_t / den_t with num_t = w*num_{t-1} + c_t*x_t and
+    den_t = w*den_{t-1} + c_t (c_t = 1 when adjusted; c_0 = 1, c_t = alpha
+    otherwise). The recurrence is unrolled with cumulative sums chunk by chunk.
+    """
+    w = 1.0 - alpha
+    if w <= 0:
+        return x.astype(float)
+
+    c = np.ones(len(x)) if adjust else np.full(len(x), alpha)
+    if len(x):
+        c[0] = 1.0
+
+    out = np.empty(len(x))
+    num = den = 0.0
+    for start in range(0, len(x), _EWM_CHUNK):
+        cx = c[start:start + _EWM_CHUNK]
+        xs = x[start:start + _EWM_CHUNK]
+        wk = w ** np.arange(len(xs))
+        nums = wk * (w * num + np.cumsum(cx * xs / wk))
+        dens = wk * (w * den + np.cumsum(cx / wk))
+        out[start:start + len(xs)] = nums / dens
+        num, den = nums[-1], dens[-1]
+    return out
+
+
+def _sma(x: np.ndarray, length: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if len(x) >= length:
+        out[length - 1:] = sliding_window_view(x, length).mean(axis=1)
+    return out
+
+
+def _std(x: np.ndarray, length: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if len(x) >= length:
+        out[length - 1:] = sliding_window_view(x, length).std(axis=1)
+    return out
+
+
+def _ema(x: np.ndarray, length: int) -> np.ndarray:
+    """EMA seeded with the SMA of the first ``length`` values."""
+    out = np.full(len(x), np.nan)
+    if len(x) < length:
+        return out
+    seeded = x[length - 1:].astype(float)
+    seeded[0] = x[:length].mean()
+    out[length - 1:] = _ewm(seeded, 2.0 / (length + 1), adjust=False)
+    return out
+
+
+def _rsi(close: np.ndarray, length: int) -> np.ndarray:
+    out = np.full(len(close), np.nan)
+    if len(close) <= length:
+        return out
+    diff = np.diff(close)
+    alpha = 1.0 / length
+    gain = _ewm(np.where(diff > 0, diff, 0.0), alpha, adjust=True)
+    loss = _ewm(np.where(diff < 0, -diff, 0.0), alpha, adjust=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = 100 * gain / (gain + loss)
+    out[:length] = np.nan
+    return out
+
+
+def _compute(close: np.ndarray, volume: np.ndarray, params: IndicatorParams) -> dict[str, np.ndarray]:
+    """All indicator series in one pass over the close/volume arrays."""
+    n = len(close)
+    series: dict[str, np.ndarray] = {"rsi_14": _rsi(close, params.rsi_length)}
+
+    if n >= max(params.macd_fast, params.macd_slow):
+        macd = _ema(close, params.macd_fast) - _ema(close, params.macd_slow)
+        first = params.macd_slow - 1
+        signal = np.full(n, np.nan)
+        signal[first:] = _ema(macd[first:], params.macd_signal)
+        series["macd"] = macd
+        series["macd_signal"] = signal
+        series["macd_hist"] = macd - signal
+
+    mid = _sma(close, params.bb_length)
+    std = _std(close, params.bb_length)
+    upper = mid + params.bb_std * std
+    lower = mid - params.bb_std * std
+    width = upper - lower
+    with np.errstate(divide="ignore", invalid="ignore"):
+        position = np.where(width > 0, (close - lower) / width, 0.5)
+    series.update(bb_upper=upper, bb_middle=mid, bb_lower=lower, bb_position=np.where(np.isnan(mid), np.nan, position))
+
+    series["sma_20"] = _sma(close, params.sma_short)
+    if n >= params.sma_long:
+        series["sma_50"] = _sma(close, params.sma_long)
+
+    avg_vol = _sma(volume, params.volume_length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(avg_vol > 0, volume / avg_vol, 1.0)
+    series["volume_ratio"] = np.where(np.isnan(avg_vol), np.nan, ratio)
+    return series
+
+
+def _arrays(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    return df["Close"].to_numpy(dtype=float), df["Volume"].to_numpy(dtype=float)
+
+
+def calculate_series(df: pd.DataFrame, params: IndicatorParams | None = None) -> pd.DataFrame:
+    """Full indicator series aligned to ``df``'s index (NaN where not yet defined)."""
+    if df.empty:
+        return pd.DataFrame(columns=SERIES_COLUMNS)
+    series = _compute(*_arrays(df), params or DEFAULT_PARAMS)
+    return pd.DataFrame(series, index=df.index).reindex(columns=SERIES_COLUMNS)
+
+
+def _round(key: str, value: float) -> float:
+    return round(value, 3 if key == "bb_position" else 2)
+
+
+def calculate_indicators(df: pd.DataFrame, params: IndicatorParams | None = None) -> dict:
+    """Calculate technical indicators from OHLCV DataFrame.
 
-    if vol_sma_20 is not None and not vol_sma_20.empty:
-        avg_vol = float(vol_sma_20.iloc[latest])
-        cur_vol = float(volume.iloc[latest])
-        result["volume_ratio"] = round(cur_vol / avg_vol, 2) if avg_vol > 0 else 1.0
+    Returns a dict of the latest values for each indicator.
+    """
+    if df.empty or len(df) < MIN_BARS:
+        return {}
 
+    series = _compute(*_arrays(df), params or DEFAULT_PARAMS)
+    last = df.index[-1]
+    result = {"date": last.date().isoformat() if hasattr(last, "date") else str(last)}
+    for key in SERIES_COLUMNS:
+        if key in series and not np.isnan(series[key][-1]):
+            result[key] = _round(key, float(series[key][-1]))
     return result
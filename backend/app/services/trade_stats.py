@@ -0,0 +1,107 @@
+"""Trade performance aggregates computed in SQL."""
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Trade, TradeTag
+
+_closed = Trade.status == "closed"
+
+
+def _aggregates() -> list:
+    return [
+        func.count().label("trades"),
+        func.sum(case((Trade.pnl > 0, 1), else_=0)).label("wins"),
+        func.sum(Trade.pnl).label("total_pnl"),
+        func.avg(Trade.pnl).label("avg_pnl"),
+        func.avg(Trade.pnl_pct).label("avg_pnl_pct"),
+    ]
+
+
+def summarize(
+    trades: int,
+    wins: int,
+    total_pnl: float | None,
+    avg_pnl: float | None,
+    avg_pnl_pct: float | None,
+) -> dict:
+    """Win rate and rounded P/L fields, shared with backtest results so the two compare."""
+    return {
+        "trades": trades,
+        "wins": wins,
+        "win_rate": round(wins / trades * 100, 1) if trades else None,
+        "total_pnl": round(total_pnl or 0.0, 2),
+        "avg_pnl": round(avg_pnl, 2) if avg_pnl is not None else None,
+        "avg_pnl_pct": round(avg_pnl_pct, 2) if avg_pnl_pct is not None else None,
+    }
+
+
+def _row(row) -> dict:
+    return summarize(row.trades or 0, row.wins or 0, row.total_pnl, row.avg_pnl, row.avg_pnl_pct)
+
+
+def _grouped(db: Session, key, stmt=None, ticker: str | None = None) -> list[dict]:
+    stmt = stmt if stmt is not None else select(key.label("key"), *_aggregates())
+    stmt = stmt.where(_closed).group_by(key).order_by(key)
+    if ticker:
+        stmt = stmt.where(Trade.ticker == ticker)
+    return [{"key": row.key, **_row(row)} for row in db.execute(stmt)]
+
+
+def compute(db: Session, ticker: str | None = None) -> dict:
+    """Win rate and P/L over closed trades, overall and per month, ticker, tag and direction."""
+    scope = [Trade.ticker == ticker] if ticker else []
+
+    overall = db.execute(
+        select(*_aggregates(), func.max(Trade.pnl).label("best"), func.min(Trade.pnl).label("worst"))
+        .where(_closed, *scope)
+    ).one()
+    open_trades = db.scalar(select(func.count()).select_from(Trade).where(Trade.status == "open", *scope))
+
+    by_tag = select(TradeTag.tag.label("key"), *_aggregates()).select_from(Trade).join(TradeTag)
+
+    return {
+        "open_trades": open_trades,
+        "closed_trades": overall.trades,
+        **{k: v for k, v in _row(overall).items() if k != "trades"},
+        "best_pnl": overall.best,
+        "worst_pnl": overall.worst,
+        "by_month": _grouped(db, func.strftime("%Y-%m", Trade.exit_date), ticker=ticker),
+        "by_ticker": _grouped(db, Trade.ticker, ticker=ticker),
+        "by_tag": _grouped(db, TradeTag.tag, by_tag, ticker=ticker),
+        "by_direction": _grouped(db, Trade.direction, ticker=ticker),
+    }
+
+
+def tag_summary(db: Session) -> list[dict]:
+    """Every tag with its open/closed trade counts and closed-trade results."""
+    stmt = (
+        select(
+            TradeTag.tag.label("key"),
+            func.sum(case((Trade.status == "open", 1), else_=0)).label("open_trades"),
+            func.sum(case((_closed, 1), else_=0)).label("trades"),
+            func.sum(case((_closed & (Trade.pnl > 0), 1), else_=0)).label("wins"),
+            func.sum(case((_closed, Trade.pnl))).label("total_pnl"),
+            func.avg(case((_closed, Trade.pnl))).label("avg_pnl"),
+            func.avg(case((_closed, Trade.pnl_pct))).label("avg_pnl_pct"),
+        )
+        .select_from(TradeTag)
+        .join(Trade)
+        .group_by(TradeTag.tag)
+        .order_by(func.count().desc(), TradeTag.tag)
+    )
+    return [{"key": row.key, "open_trades": row.open_trades, **_row(row)} for row in db.execute(stmt)]
+
+
+def ticker_summary(db: Session, ticker: str) -> dict | None:
+    """Closed-trade record for one ticker, labelled for the LLM context (None without history)."""
+    row = db.execute(select(*_aggregates()).where(_closed, Trade.ticker == ticker)).one()
+    if not row.trades:
+        return None
+    stats = _row(row)
+    return {
+        "トレード数": stats["trades"],
+        "勝率": f"{stats['win_rate']:.0f}%",
+        "累計P/L(1株あたり)": stats["total_pnl"],
+        "平均P/L率": f"{stats['avg_pnl_pct']:+.2f}%" if stats["avg_pnl_pct"] is not None else "N/A",
+    }
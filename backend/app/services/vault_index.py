@@ -0,0 +1,172 @@
+"""Index of trade notes under the vault's TRADE_DIR.
+
+The vault usually sits on a slow mounted drive, so notes are only re-read
+when their mtime or size changed since the last scan. The index is persisted
+next to the database, so a restart costs one directory listing rather than
+reading every note again.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from app.db.database import DB_PATH
+from app.services import obsidian
+
+VAULT_INDEX_PATH = os.getenv(
+    "VAULT_INDEX_PATH", os.path.join(os.path.dirname(DB_PATH) or ".", "vault_index.json")
+)
+RESCAN_SECONDS = 60  # lookups within this window trust the last scan
+
+
+@dataclass
+class NoteEntry:
+    filename: str
+    mtime_ns: int
+    size: int
+    trade_id: int | None
+    ticker: str | None
+    entry_date: str | None
+    entry_price: float | None
+    status: str | None
+    frontmatter: dict[str, str]
+
+
+def _field(frontmatter: dict[str, str], key: str) -> str | None:
+    return obsidian.frontmatter_value(frontmatter.get(key))
+
+
+def _parse_entry(filename: str, stat: os.stat_result, content: str) -> NoteEntry:
+    fields, _ = obsidian.parse_frontmatter(content)
+    frontmatter = {k: v for k, v in fields.items() if not k.startswith("\0")}
+    trade_id = _field(frontmatter, "trade_id")
+    entry_price = _field(frontmatter, "entry_price")
+    try:
+        entry_price = float(entry_price) if entry_price else None
+    except ValueError:
+        entry_price = None
+    return NoteEntry(
+        filename=filename,
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        trade_id=int(trade_id) if trade_id and trade_id.isdigit() else None,
+        ticker=_field(frontmatter, "ticker"),
+        entry_date=_field(frontmatter, "entry_date"),
+        entry_price=entry_price,
+        status=_field(frontmatter, "status"),
+        frontmatter=frontmatter,
+    )
+
+
+class VaultIndex:
+    def __init__(self, trade_dir: Path, index_path: str):
+        self.trade_dir = trade_dir
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._entries: dict[str, NoteEntry] = {}
+        self._by_trade: dict[int, str] = {}
+        self._scanned_at = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("trade_dir") != str(self.trade_dir):
+            return
+        for raw in data.get("entries", []):
+            entry = NoteEntry(**raw)
+            self._entries[entry.filename] = entry
+        self._reindex()
+
+    def _save(self):
+        data = {"trade_dir": str(self.trade_dir), "entries": [asdict(e) for e in self._entries.values()]}
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+
+    def _reindex(self):
+        self._by_trade = {e.trade_id: name for name, e in self._entries.items() if e.trade_id is not None}
+
+    def refresh(self, force: bool = False) -> dict:
+        """Rescan TRADE_DIR, reading only new or modified notes. Returns scan counts."""
+        with self._lock:
+            if not force and time.monotonic() - self._scanned_at < RESCAN_SECONDS:
+                return {"notes": len(self._entries), "read": 0, "removed": 0}
+
+            seen: set[str] = set()
+            read = 0
+            try:
+                listing = list(os.scandir(self.trade_dir))
+            except FileNotFoundError:
+                listing = []
+            for dirent in listing:
+                if not dirent.name.endswith(".md") or not dirent.is_file():
+                    continue
+                seen.add(dirent.name)
+                stat = dirent.stat()
+                cached = self._entries.get(dirent.name)
+                if cached and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+                    continue
+                content = Path(dirent.path).read_text(encoding="utf-8")
+                self._entries[dirent.name] = _parse_entry(dirent.name, stat, content)
+                read += 1
+
+            removed = [name for name in self._entries if name not in seen]
+            for name in removed:
+                del self._entries[name]
+            self._reindex()
+            self._scanned_at = time.monotonic()
+            if read or removed:
+                self._save()
+            return {"notes": len(self._entries), "read": read, "removed": len(removed)}
+
+    def find(self, trade) -> Path | None:
+        """Note for a trade: by trade_id, else a legacy note matching ticker, date and price."""
+        self.refresh()
+        with self._lock:
+            name = self._by_trade.get(trade.id)
+            if name is None:
+                name = self._find_legacy(trade)
+        return self.trade_dir / name if name else None
+
+    def _find_legacy(self, trade) -> str | None:
+        name = obsidian.legacy_trade_note_name(trade.ticker, trade.entry_date)
+        entry = self._entries.get(name)
+        if entry is None or entry.trade_id is not None:
+            return None
+        # Same-day trades in one ticker shared this file; it holds the last one written
+        if entry.entry_price is not None and entry.entry_price != trade.entry_price:
+            return None
+        return name
+
+    def record(self, path: Path, content: str, save: bool = True):
+        """Update the entry for a note this process just wrote, without re-reading it."""
+        with self._lock:
+            self._entries[path.name] = _parse_entry(path.name, path.stat(), content)
+            self._reindex()
+            if save:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+
+_index: VaultIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> VaultIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VaultIndex(Path(obsidian.VAULT_PATH) / obsidian.TRADE_DIR, VAULT_INDEX_PATH)
+        return _index
@@ -1,5 +1,7 @@
 """Stock Dashboard - Streamlit Frontend."""
 
+from datetime import date
+
 import httpx
 import streamlit as st
 
@@ -28,19 +30,16 @@ monthly_pl = "—"
 win_rate = "—"
 
 try:
-    open_resp = httpx.get(f"{API_BASE}/trade/?status=open", timeout=5)
-    closed_resp = httpx.get(f"{API_BASE}/trade/?status=closed", timeout=5)
-
-    if open_resp.status_code == 200:
-        open_count = str(len(open_resp.json()))
-
-    if closed_resp.status_code == 200:
-        closed = closed_resp.json()
-        if closed:
-            wins = sum(1 for t in closed if (t.get("pnl") or 0) > 0)
-            win_rate = f"{wins / len(closed) * 100:.0f}%"
-            total_pl = sum(t.get("pnl") or 0 for t in closed)
-            monthly_pl = f"{'+'if total_pl >= 0 else ''}{total_pl:,.0f}円"
+    stats_resp = httpx.get(f"{API_BASE}/trade/stats", timeout=5)
+
+    if stats_resp.status_code == 200:
+        stats = stats_resp.json()
+        open_count = str(stats["open_trades"])
+        if stats["closed_trades"]:
+            win_rate = f"{stats['win_rate']:.0f}%"
+        this_month = date.today().strftime("%Y-%m")
+        month_pl = next((m["total_pnl"] for m in stats["by_month"] if m["key"] == this_month), 0.0)
+        monthly_pl = f"{'+'if month_pl >= 0 else ''}{month_pl:,.0f}円"
 except httpx.ConnectError:
     st.warning("バックエンドに接続できません。`uvicorn app.main:app --reload` を確認してください。")
 
@@ -48,6 +47,6 @@ col1, col2, col3 = st.columns(3)
 with col1:
     st.metric("オープンポジション", open_count, help="現在保有中のポジション数")
 with col2:
-    st.metric("今月P/L", monthly_pl, help="確定損益合計")
+    st.metric("今月P/L", monthly_pl, help="今月クローズしたトレードの確定損益合計")
 with col3:
     st.metric("勝率", win_rate, help="クローズ済みトレードの勝率")
@@ -1,5 +1,7 @@
 """AI Analysis Chat page."""
 
+import json
+
 import httpx
 import streamlit as st
 
@@ -46,23 +48,41 @@ if prompt := st.chat_input("銘柄について質問..."):
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
-        with st.spinner("分析中..."):
-            try:
-                resp = httpx.post(
-                    f"{API_BASE}/analysis/chat",
-                    json={
-                        "message": prompt,
-                        "ticker": ticker or None,
-                        "conversation_id": st.session_state.conversation_id,
-                    },
-                    timeout=60,
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    st.markdown(data["response"])
-                    st.session_state.messages.append({"role": "assistant", "content": data["response"]})
-                    st.session_state.conversation_id = data["conversation_id"]
-                else:
-                    st.error(f"API Error: {resp.status_code}")
-            except httpx.ConnectError:
-                st.error("バックエンドに接続できません。docker compose up を確認してください。")
+        stream_state = {"error": None}
+
+        def stream_tokens():
+            """Yield answer text from the SSE stream, recording conversation_id / errors."""
+            with httpx.stream(
+                "POST",
+                f"{API_BASE}/analysis/chat/stream",
+                json={
+                    "message": prompt,
+                    "ticker": ticker or None,
+                    "conversation_id": st.session_state.conversation_id,
+                },
+                timeout=httpx.Timeout(10, read=120),
+            ) as resp:
+                if resp.status_code != 200:
+                    stream_state["error"] = f"API Error: {resp.status_code}"
+                    return
+                event = None
+                for line in resp.iter_lines():
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: "):
+                        data = json.loads(line[len("data: "):])
+                        if event == "token":
+                            yield data["text"]
+                        elif event in ("meta", "done"):
+                            st.session_state.conversation_id = data["conversation_id"]
+                        elif event == "error":
+                            stream_state["error"] = data["detail"]
+
+        try:
+            answer = st.write_stream(stream_tokens())
+            if stream_state["error"]:
+                st.error(stream_state["error"])
+            elif answer:
+                st.session_state.messages.append({"role": "assistant", "content": answer})
+        except httpx.ConnectError:
+            st.error("バックエンドに接続できません。docker compose up を確認してください。")
@@ -5,59 +5,102 @@ import streamlit as st
 
 from config import API_BASE
 
+PAGE_SIZE = 20
+CACHE_TTL = 30  # seconds; trades changed elsewhere show up within this
+
 st.title("📓 トレードジャーナル")
 
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_page(status: str, cursor: str | None) -> tuple[list[dict], str | None]:
+    """One page of trades and the next page's cursor."""
+    params = {"status": status, "limit": PAGE_SIZE}
+    if cursor:
+        params["cursor"] = cursor
+    resp = httpx.get(f"{API_BASE}/trade/", params=params, timeout=10)
+    resp.raise_for_status()
+    return resp.json(), resp.headers.get("X-Next-Cursor")
+
+
+def load_trades(status: str) -> list[dict]:
+    """Trades of every page opened so far in a tab; only the cursors live in the session."""
+    cursors = st.session_state.setdefault(f"journal_{status}", [None])
+    trades = []
+    for cursor in cursors:
+        page, next_cursor = fetch_page(status, cursor)
+        trades.extend(page)
+    st.session_state[f"journal_{status}_next"] = next_cursor
+    return trades
+
+
+def more_button(status: str):
+    next_cursor = st.session_state.get(f"journal_{status}_next")
+    if next_cursor and st.button("さらに読み込む", key=f"more_{status}"):
+        st.session_state[f"journal_{status}"].append(next_cursor)
+        st.rerun()
+
+
+def reset_trades():
+    fetch_page.clear()
+    for status in ("open", "closed"):
+        st.session_state.pop(f"journal_{status}", None)
+
+
+if st.button("🔄 更新"):
+    reset_trades()
+
 tab_open, tab_closed = st.tabs(["オープン", "クローズ済み"])
 
 try:
     # Open trades
     with tab_open:
-        resp = httpx.get(f"{API_BASE}/trade/?status=open", timeout=10)
-        if resp.status_code == 200:
-            trades = resp.json()
-            if not trades:
-                st.info("オープンポジションはありません")
-            for trade in trades:
-                with st.expander(f"{trade['ticker']} {trade['direction'].upper()} @{trade['entry_price']}"):
-                    st.markdown(f"**エントリー日**: {trade['entry_date']}")
-                    if trade.get("target_price"):
-                        st.markdown(f"**目標**: {trade['target_price']} / **損切**: {trade.get('stop_loss', 'N/A')}")
-                    st.markdown(f"**根拠**: {trade.get('entry_reason', '')}")
-                    st.markdown(f"**タグ**: {', '.join(trade.get('tags', []))}")
-
-                    # Close form
-                    with st.form(f"close_{trade['id']}"):
-                        exit_price = st.number_input("決済価格", min_value=0.0, step=1.0, key=f"ep_{trade['id']}")
-                        exit_reason = st.text_input("決済理由", key=f"er_{trade['id']}")
-                        if st.form_submit_button("クローズ"):
-                            resp = httpx.post(
-                                f"{API_BASE}/trade/{trade['id']}/close",
-                                json={"exit_price": exit_price, "exit_reason": exit_reason},
-                                timeout=10,
-                            )
-                            if resp.status_code == 200:
-                                st.success("クローズしました")
-                                st.rerun()
+        trades = load_trades("open")
+        if not trades:
+            st.info("オープンポジションはありません")
+        for trade in trades:
+            with st.expander(f"{trade['ticker']} {trade['direction'].upper()} @{trade['entry_price']}"):
+                st.markdown(f"**エントリー日**: {trade['entry_date']}")
+                if trade.get("target_price"):
+                    st.markdown(f"**目標**: {trade['target_price']} / **損切**: {trade.get('stop_loss', 'N/A')}")
+                st.markdown(f"**根拠**: {trade.get('entry_reason', '')}")
+                st.markdown(f"**タグ**: {', '.join(trade.get('tags', []))}")
+
+                # Close form
+                with st.form(f"close_{trade['id']}"):
+                    exit_price = st.number_input("決済価格", min_value=0.0, step=1.0, key=f"ep_{trade['id']}")
+                    exit_reason = st.text_input("決済理由", key=f"er_{trade['id']}")
+                    if st.form_submit_button("クローズ"):
+                        resp = httpx.post(
+                            f"{API_BASE}/trade/{trade['id']}/close",
+                            json={"exit_price": exit_price, "exit_reason": exit_reason},
+                            timeout=10,
+                        )
+                        if resp.status_code == 200:
+                            st.success("クローズしました")
+                            reset_trades()
+                            st.rerun()
+        more_button("open")
 
     # Closed trades
     with tab_closed:
-        resp = httpx.get(f"{API_BASE}/trade/?status=closed", timeout=10)
-        if resp.status_code == 200:
-            trades = resp.json()
-            if not trades:
-                st.info("クローズ済みトレードはありません")
-            for trade in trades:
-                pnl = trade.get("pnl", 0)
-                pnl_pct = trade.get("pnl_pct", 0)
-                emoji = "🟢" if pnl and pnl > 0 else "🔴"
-                with st.expander(f"{emoji} {trade['ticker']} {trade['direction'].upper()} P/L: {pnl_pct:.1f}%"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.markdown(f"**Entry**: {trade['entry_date']} @{trade['entry_price']}")
-                    with col2:
-                        st.markdown(f"**Exit**: {trade.get('exit_date')} @{trade.get('exit_price')}")
-                    st.markdown(f"**根拠**: {trade.get('entry_reason', '')}")
-                    st.markdown(f"**決済理由**: {trade.get('exit_reason', '')}")
+        trades = load_trades("closed")
+        if not trades:
+            st.info("クローズ済みトレードはありません")
+        for trade in trades:
+            pnl = trade.get("pnl", 0)
+            pnl_pct = trade.get("pnl_pct", 0)
+            emoji = "🟢" if pnl and pnl > 0 else "🔴"
+            with st.expander(f"{emoji} {trade['ticker']} {trade['direction'].upper()} P/L: {pnl_pct:.1f}%"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown(f"**Entry**: {trade['entry_date']} @{trade['entry_price']}")
+                with col2:
+                    st.markdown(f"**Exit**: {trade.get('exit_date')} @{trade.get('exit_price')}")
+                st.markdown(f"**根拠**: {trade.get('entry_reason', '')}")
+                st.markdown(f"**決済理由**: {trade.get('exit_reason', '')}")
+        more_button("closed")
 
 except httpx.ConnectError:
     st.error("バックエンドに接続できません")
+except httpx.HTTPStatusError as e:
+    st.error(f"トレードを取得できませんでした ({e.response.status_code})")